@@ -1,5 +1,6 @@
 from flask import Flask, render_template
-from app.extensions import db, login_manager, migrate, csrf
+from app.extensions import db, login_manager, migrate, csrf, view_log_buffer, view_counter_buffer, page_cache, \
+    query_cache, user_cache, image_pipeline, image_resizer, password_hasher, availability_index, profiler
 import os
 
 def create_app(config_name='default'):
@@ -16,11 +17,34 @@ def create_app(config_name='default'):
     
     app.config.from_object(config_class)
     
+    # Pool settings of the SQLite profile have to be in place before the engine is made
+    from app.sqlite import configure_sqlite, register_sqlite_pragmas
+    configure_sqlite(app)
+    
+    # Replica binds take SELECTs from @replica_reads views
+    from app.routing import init_replicas
+    init_replicas(app)
+    
     # Initialize extensions
     db.init_app(app)
+    register_sqlite_pragmas(app, db)
     login_manager.init_app(app)
     migrate.init_app(app, db)
     csrf.init_app(app)
+    view_log_buffer.init_app(app)
+    view_counter_buffer.init_app(app)
+    page_cache.init_app(app)
+    query_cache.init_app(app)
+    user_cache.init_app(app)
+    image_pipeline.init_app(app)
+    image_resizer.init_app(app)
+    password_hasher.init_app(app)
+    availability_index.init_app(app)
+    profiler.init_app(app)
+    
+    # Uploads are served through /media, optionally handed off to the proxy
+    from app.media import init_media
+    init_media(app)
     
     # Configure login manager
     login_manager.login_view = 'auth.login'
@@ -52,6 +76,25 @@ def create_app(config_name='default'):
     except ImportError as e:
         print(f"Warning: Could not import admin blueprint: {e}")
     
+    # Sanitized HTML, summaries and counts are rendered when rows are written
+    from app.rendering import register_render_hooks
+    register_render_hooks(db)
+    
+    # Keep the full-text index in step with project and blog writes
+    from app.search import register_search_hooks
+    register_search_hooks(db)
+    
+    # Keep per-technology project counts current
+    from app.technologies import register_technology_hooks
+    register_technology_hooks(db)
+    
+    # Dashboard counters follow inserts and deletes in the same transaction
+    from app.counters import register_counter_hooks
+    register_counter_hooks(db)
+    
+    from app.commands import register_commands
+    register_commands(app)
+    
     # Simple test route
     @app.route('/test')
     def test_route():
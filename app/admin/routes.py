@@ -1,8 +1,10 @@
-from flask import render_template, redirect, url_for, flash, request
+from flask import render_template, redirect, url_for, flash, request, jsonify
 from flask_login import login_required, current_user
 from app.admin import admin_bp
-from app.models import User, Project, BlogPost, ViewLog
-from app.extensions import db
+from app.models import User, Project, BlogPost, SiteCounter
+from app.pagination import paginate_query
+from app.extensions import db, view_log_buffer, view_counter_buffer, page_cache, query_cache, \
+    password_hasher, availability_index, image_resizer, profiler
 
 @admin_bp.before_request
 @login_required
@@ -13,11 +15,12 @@ def restrict_admin():
 
 @admin_bp.route('/')
 def dashboard():
-    # Get statistics
-    total_users = User.query.count()
-    total_projects = Project.query.count()
-    total_posts = BlogPost.query.count()
-    total_views = ViewLog.query.count()
+    # Get statistics from the maintained counters (see app.counters)
+    totals = SiteCounter.totals(['users', 'projects', 'blog_posts', 'view_logs'])
+    total_users = totals.get('users', 0)
+    total_projects = totals.get('projects', 0)
+    total_posts = totals.get('blog_posts', 0)
+    total_views = totals.get('view_logs', 0)
     
     # Get recent users
     recent_users = User.query.order_by(User.created_at.desc()).limit(10).all()
@@ -30,13 +33,9 @@ def dashboard():
     today = datetime.utcnow().date()
     week_ago = today - timedelta(days=7)
     
-    new_users_week = User.query.filter(
-        db.func.date(User.created_at) >= week_ago
-    ).count()
-    
-    new_projects_week = Project.query.filter(
-        db.func.date(Project.created_at) >= week_ago
-    ).count()
+    new_this_week = SiteCounter.since(['users', 'projects'], week_ago)
+    new_users_week = new_this_week.get('users', 0)
+    new_projects_week = new_this_week.get('projects', 0)
     
     return render_template('admin/dashboard.html',
                          total_users=total_users,
@@ -50,11 +49,10 @@ def dashboard():
 
 @admin_bp.route('/users')
 def users():
-    page = request.args.get('page', 1, type=int)
     per_page = 20
     
-    users = User.query.order_by(User.created_at.desc())\
-        .paginate(page=page, per_page=per_page, error_out=False)
+    # Cursor-paginated; pass ?page= for numbered pages with a total count
+    users = paginate_query(User.query, User, per_page)
     
     return render_template('admin/users.html', users=users)
 
@@ -70,11 +68,10 @@ def toggle_user(user_id):
 
 @admin_bp.route('/projects')
 def projects():
-    page = request.args.get('page', 1, type=int)
     per_page = 20
     
-    projects = Project.query.order_by(Project.created_at.desc())\
-        .paginate(page=page, per_page=per_page, error_out=False)
+    # Cursor-paginated; pass ?page= for numbered pages with a total count
+    projects = paginate_query(Project.query, Project, per_page)
     
     return render_template('admin/projects.html', projects=projects)
 
@@ -88,50 +85,93 @@ def toggle_project(project_id):
     flash(f'Project "{project.title}" has been {status}.', 'success')
     return redirect(url_for('admin.projects'))
 
+ANALYTICS_MAX_DAYS = 365
+
+@query_cache.memoize(tags=lambda name, since: [name])
+def daily_new(name, since):
+    # Per-day buckets of the maintained site counters: a primary-key range
+    # read instead of grouping the source table by date()
+    return db.session.execute(
+        db.select(SiteCounter.day.label('date'), SiteCounter.count.label('count'))
+        .where(SiteCounter.name == name, SiteCounter.day >= since)
+        .order_by(SiteCounter.day)
+    ).all()
+
+# Views are bumped through Core by the counter buffer, so only the TTL refreshes them
+@query_cache.memoize(tags=['projects'], ttl=60)
+def top_viewed_projects(limit=10):
+    return db.session.execute(
+        db.select(Project.id, Project.title, Project.slug, Project.views, User.username)
+        .join(User, User.id == Project.user_id)
+        .order_by(Project.views.desc()).limit(limit)
+    ).all()
+
+@query_cache.memoize(tags=['users', 'projects'])
+def top_users_by_projects(limit=10):
+    project_count = db.func.count(Project.id).label('project_count')
+    return db.session.execute(
+        db.select(User.id, User.username, User.full_name, project_count)
+        .join(Project, Project.user_id == User.id).group_by(User.id)
+        .order_by(project_count.desc()).limit(limit)
+    ).all()
+
 @admin_bp.route('/analytics')
 def analytics():
     from datetime import datetime, timedelta
     
-    # Get date range
-    days = int(request.args.get('days', 30))
-    end_date = datetime.utcnow()
-    start_date = end_date - timedelta(days=days)
-    
-    # Get daily user registrations
-    daily_registrations = db.session.query(
-        db.func.date(User.created_at).label('date'),
-        db.func.count(User.id).label('count')
-    ).filter(
-        User.created_at >= start_date
-    ).group_by(
-        db.func.date(User.created_at)
-    ).order_by('date').all()
-    
-    # Get daily project creations
-    daily_projects = db.session.query(
-        db.func.date(Project.created_at).label('date'),
-        db.func.count(Project.id).label('count')
-    ).filter(
-        Project.created_at >= start_date
-    ).group_by(
-        db.func.date(Project.created_at)
-    ).order_by('date').all()
-    
-    # Get top viewed projects
-    top_projects = Project.query.order_by(Project.views.desc()).limit(10).all()
+    # Get date range; clamped so arbitrary ?days= values share cache entries
+    days = min(max(request.args.get('days', 30, type=int), 1), ANALYTICS_MAX_DAYS)
+    start_day = datetime.utcnow().date() - timedelta(days=days)
     
-    # Get top active users
-    from sqlalchemy import func
-    top_users = db.session.query(
-        User,
-        func.count(Project.id).label('project_count')
-    ).join(Project).group_by(User.id)\
-     .order_by(func.count(Project.id).desc())\
-     .limit(10).all()
+    daily_registrations = daily_new('users', start_day)
+    daily_projects = daily_new('projects', start_day)
+    top_projects = top_viewed_projects()
+    top_users = top_users_by_projects()
     
     return render_template('admin/analytics.html',
                          days=days,
                          daily_registrations=daily_registrations,
                          daily_projects=daily_projects,
                          top_projects=top_projects,
-                         top_users=top_users)
\ No newline at end of file
+                         top_users=top_users)
+
+@admin_bp.route('/stats/buffers')
+def buffer_stats():
+    return jsonify({
+        'view_logs': view_log_buffer.stats(),
+        'view_counters': view_counter_buffer.stats()
+    })
+
+@admin_bp.route('/stats/cache')
+def cache_stats():
+    return jsonify({'pages': page_cache.stats(), 'queries': query_cache.stats()})
+
+@admin_bp.route('/stats/passwords')
+def password_stats():
+    return jsonify(password_hasher.stats())
+
+@admin_bp.route('/stats/availability')
+def availability_stats():
+    return jsonify(availability_index.stats())
+
+@admin_bp.route('/stats/images')
+def image_stats():
+    return jsonify(image_resizer.stats())
+
+@admin_bp.route('/stats/perf')
+def perf_stats():
+    return jsonify(profiler.stats(request.args.get('sort', 'total')))
+
+@admin_bp.route('/perf')
+def perf():
+    sort = request.args.get('sort', 'total')
+    return render_template('admin/perf.html',
+                         enabled=profiler.enabled,
+                         endpoints=profiler.stats(sort),
+                         sort=sort)
+
+@admin_bp.route('/perf/reset', methods=['POST'])
+def reset_perf():
+    profiler.reset()
+    flash('Profiling statistics cleared.', 'success')
+    return redirect(url_for('admin.perf'))
\ No newline at end of file
@@ -1,7 +1,10 @@
 from flask_wtf import FlaskForm
 from wtforms import StringField, PasswordField, SubmitField, BooleanField
 from wtforms.validators import DataRequired, Email, Length, EqualTo, ValidationError
-from app.models import User
+from app.extensions import availability_index
+
+USERNAME_TAKEN = 'Username already exists. Please choose a different one.'
+EMAIL_TAKEN = 'Email already registered. Please use a different one.'
 
 class RegistrationForm(FlaskForm):
     username = StringField('Username', 
@@ -18,15 +21,16 @@ class RegistrationForm(FlaskForm):
                                                EqualTo('password')])
     submit = SubmitField('Sign Up')
     
+    # The index only queries the database on a possible match; refresh=True
+    # first picks up accounts created by other workers. It can still miss a
+    # name taken moments ago, which the register view catches on commit
     def validate_username(self, username):
-        user = User.query.filter_by(username=username.data).first()
-        if user:
-            raise ValidationError('Username already exists. Please choose a different one.')
+        if availability_index.username_taken(username.data, refresh=True):
+            raise ValidationError(USERNAME_TAKEN)
     
     def validate_email(self, email):
-        user = User.query.filter_by(email=email.data).first()
-        if user:
-            raise ValidationError('Email already registered. Please use a different one.')
+        if availability_index.email_taken(email.data, refresh=True):
+            raise ValidationError(EMAIL_TAKEN)
 
 class LoginForm(FlaskForm):
     email = StringField('Email', 
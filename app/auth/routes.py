@@ -1,9 +1,13 @@
-from flask import render_template, redirect, url_for, flash, request
+from flask import render_template, redirect, url_for, flash, request, jsonify
 from flask_login import login_user, logout_user, current_user, login_required
+from sqlalchemy.exc import IntegrityError
 from app.auth import auth_bp
-from app.auth.forms import RegistrationForm, LoginForm, ResetPasswordForm
+from app.auth.forms import RegistrationForm, LoginForm, ResetPasswordForm, USERNAME_TAKEN, EMAIL_TAKEN
 from app.models import User
-from app.extensions import db
+from app.extensions import db, availability_index
+from app.passwords import HasherBusy
+
+BUSY_MESSAGE = 'We are handling a lot of sign-ins right now. Please try again in a moment.'
 
 @auth_bp.route('/register', methods=['GET', 'POST'])
 def register():
@@ -12,13 +16,27 @@ def register():
     
     form = RegistrationForm()
     if form.validate_on_submit():
-        user = User(
-            username=form.username.data,
-            email=form.email.data,
-            password=form.password.data
-        )
+        try:
+            user = User(
+                username=form.username.data,
+                email=form.email.data,
+                password=form.password.data
+            )
+        except HasherBusy:
+            flash(BUSY_MESSAGE, 'warning')
+            return render_template('auth/register.html', form=form, title='Register'), 503
         db.session.add(user)
-        db.session.commit()
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # Taken by an account the availability index hadn't seen yet
+            db.session.rollback()
+            availability_index.add(user)
+            if User.query.filter_by(username=user.username).first():
+                form.username.errors.append(USERNAME_TAKEN)
+            if User.query.filter_by(email=user.email).first():
+                form.email.errors.append(EMAIL_TAKEN)
+            return render_template('auth/register.html', form=form, title='Register')
         
         flash('Your account has been created! You can now log in.', 'success')
         return redirect(url_for('auth.login'))
@@ -33,7 +51,17 @@ def login():
     form = LoginForm()
     if form.validate_on_submit():
         user = User.query.filter_by(email=form.email.data).first()
-        if user and user.verify_password(form.password.data):
+        try:
+            verified = user is not None and user.verify_password(form.password.data)
+            # Upgrade hashes made with older parameters while the password is at hand
+            if verified and user.password_needs_rehash:
+                user.password = form.password.data
+                db.session.commit()
+        except HasherBusy:
+            flash(BUSY_MESSAGE, 'warning')
+            return render_template('auth/login.html', form=form, title='Login'), 503
+        
+        if verified:
             login_user(user, remember=form.remember.data)
             next_page = request.args.get('next')
             flash('You have been logged in successfully!', 'success')
@@ -72,4 +100,26 @@ def reset_password():
 def confirm_email(token):
     # Email confirmation implementation
     flash('Email confirmed successfully!', 'success')
-    return redirect(url_for('portfolio.dashboard'))
\ No newline at end of file
+    return redirect(url_for('portfolio.dashboard'))
+
+@auth_bp.route('/api/availability')
+def api_availability():
+    username = request.args.get('username', '').strip()
+    email = request.args.get('email', '').strip()
+    if not username and not email:
+        return jsonify({'error': 'username or email is required'}), 400
+    
+    result = {}
+    if username:
+        valid = 3 <= len(username) <= 64
+        result['username'] = {
+            'value': username,
+            'valid': valid,
+            'available': valid and not availability_index.username_taken(username)
+        }
+    if email:
+        result['email'] = {
+            'value': email,
+            'available': not availability_index.email_taken(email)
+        }
+    return jsonify(result)
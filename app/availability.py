@@ -0,0 +1,206 @@
+import hashlib
+import math
+import threading
+import time
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings.
+
+    ``in`` never gives a false negative; a positive answer is only a
+    "maybe", with roughly ``error_rate`` false positives at ``capacity``
+    entries. Entries cannot be removed.
+    """
+
+    def __init__(self, capacity, error_rate=0.01):
+        capacity = max(capacity, 1)
+        self.size = max(int(-capacity * math.log(error_rate) / math.log(2) ** 2), 8)
+        self.hashes = max(int(round(self.size / capacity * math.log(2))), 1)
+        self.capacity = capacity
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, value):
+        digest = hashlib.blake2b(value.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, value):
+        for position in self._positions(value):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, value):
+        return all(self._bits[position >> 3] & (1 << (position & 7))
+                   for position in self._positions(value))
+
+
+class AvailabilityIndex:
+    """Answers "is this username/email taken?" mostly without the database.
+
+    Every existing username and email goes into a Bloom filter. A miss is a
+    definite "available"; a possible hit is confirmed with an indexed query.
+    The filter is built on first use and fed by User insert/update events.
+    Users created by other worker processes are picked up by reading rows
+    past the highest id seen, at most every AVAILABILITY_REFRESH_INTERVAL
+    seconds, and the filter is rebuilt from scratch every
+    AVAILABILITY_REBUILD_INTERVAL seconds (or once it is over capacity) to
+    shed renamed values and catch renames made elsewhere. A row another
+    worker commits after one with a higher id is missed until the next
+    rebuild, so the unique constraints stay the final word.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self.enabled = False
+        self._filter = None
+        self._max_id = 0
+        self._built_at = 0.0
+        self._refreshed_at = 0.0
+        self._lock = threading.Lock()          # guards the filter and the counters
+        self._refresh_lock = threading.Lock()  # one build or catch-up at a time
+        self.lookups = 0
+        self.db_checks = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('AVAILABILITY_INDEX_ENABLED', True)
+        app.config.setdefault('AVAILABILITY_BLOOM_CAPACITY', 100000)
+        app.config.setdefault('AVAILABILITY_BLOOM_ERROR_RATE', 0.01)
+        app.config.setdefault('AVAILABILITY_REFRESH_INTERVAL', 5)
+        app.config.setdefault('AVAILABILITY_REBUILD_INTERVAL', 3600)
+
+        self.app = app
+        self.enabled = app.config['AVAILABILITY_INDEX_ENABLED']
+        self._filter = None
+
+        app.extensions['availability_index'] = self
+        _register_hooks(self)
+
+    def username_taken(self, username, refresh=False):
+        from app.models import User
+        return self._taken('u', username, User.username, refresh)
+
+    def email_taken(self, email, refresh=False):
+        from app.models import User
+        return self._taken('e', email, User.email, refresh)
+
+    def add(self, user):
+        """Record a user's current username and email."""
+        with self._lock:
+            if self._filter is None:
+                return
+            if user.username:
+                self._filter.add(f'u:{user.username}')
+            if user.email:
+                self._filter.add(f'e:{user.email}')
+            # _max_id is left alone: rows other processes insert meanwhile
+            # may have lower ids and still need to be caught up
+
+    def stats(self):
+        with self._lock:
+            return {
+                'built': self._filter is not None,
+                'entries': self._filter.count if self._filter is not None else 0,
+                'capacity': self._filter.capacity if self._filter is not None else 0,
+                'lookups': self.lookups,
+                'db_checks': self.db_checks,
+            }
+
+    def _taken(self, prefix, value, column, refresh):
+        from app.models import User
+
+        if not value:
+            return False
+        if not self.enabled:
+            return self._exists(User, column, value)
+
+        self._update(force_refresh=refresh)
+        with self._lock:
+            self.lookups += 1
+            maybe = f'{prefix}:{value}' in self._filter
+            if maybe:
+                self.db_checks += 1
+        return maybe and self._exists(User, column, value)
+
+    def _exists(self, User, column, value):
+        from app.extensions import db
+        return db.session.execute(
+            db.select(User.id).where(column == value).limit(1)
+        ).first() is not None
+
+    def _update(self, force_refresh=False):
+        config = self.app.config
+        with self._refresh_lock:
+            now = time.monotonic()
+            with self._lock:
+                stale = self._filter is None \
+                    or now - self._built_at >= config['AVAILABILITY_REBUILD_INTERVAL'] \
+                    or self._filter.count > self._filter.capacity
+                due = force_refresh or now - self._refreshed_at >= config['AVAILABILITY_REFRESH_INTERVAL']
+            if stale:
+                self._build()
+            elif due:
+                self._catch_up()
+
+    def _build(self):
+        from app.extensions import db
+        from app.models import User
+
+        config = self.app.config
+        rows = db.session.execute(db.select(User.id, User.username, User.email)).all()
+        bloom = BloomFilter(max(config['AVAILABILITY_BLOOM_CAPACITY'], len(rows) * 2),
+                            config['AVAILABILITY_BLOOM_ERROR_RATE'])
+        for row in rows:
+            bloom.add(f'u:{row.username}')
+            bloom.add(f'e:{row.email}')
+
+        with self._lock:
+            self._filter = bloom
+            self._max_id = max((row.id for row in rows), default=0)
+            self._built_at = self._refreshed_at = time.monotonic()
+
+    def _catch_up(self):
+        from app.extensions import db
+        from app.models import User
+
+        with self._lock:
+            max_id = self._max_id
+        rows = db.session.execute(
+            db.select(User.id, User.username, User.email).where(User.id > max_id)
+        ).all()
+        with self._lock:
+            for row in rows:
+                self._filter.add(f'u:{row.username}')
+                self._filter.add(f'e:{row.email}')
+                self._max_id = max(self._max_id, row.id)
+            self._refreshed_at = time.monotonic()
+
+
+_registered = False
+
+
+def _register_hooks(index):
+    global _registered
+    if _registered:
+        return
+    _registered = True
+
+    from sqlalchemy import event, inspect
+    from app.models import User
+
+    # Added at flush rather than commit: a rolled-back name only costs a
+    # database check later, while a late add could report a taken name as free
+    def record(mapper, connection, target):
+        index.add(target)
+
+    # Other updates (a rehash, a profile edit) would only fill the filter up
+    def record_renames(mapper, connection, target):
+        attrs = inspect(target).attrs
+        if attrs.username.history.has_changes() or attrs.email.history.has_changes():
+            index.add(target)
+
+    event.listen(User, 'after_insert', record)
+    event.listen(User, 'after_update', record_renames)
@@ -0,0 +1,263 @@
+import atexit
+import queue
+import threading
+import time
+
+
+class ViewLogBuffer:
+    """Bounded in-process queue of ViewLog rows written in bulk by a background thread.
+
+    Rows are flushed as one multi-row INSERT every ``VIEW_LOG_BATCH_SIZE`` rows
+    or ``VIEW_LOG_FLUSH_INTERVAL_MS`` milliseconds, whichever comes first.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self.enabled = False
+        self._queue = None
+        self._thread = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self.queued = 0
+        self.flushed = 0
+        self.dropped = 0
+        self.failed = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('VIEW_LOG_BUFFERED', True)
+        app.config.setdefault('VIEW_LOG_BATCH_SIZE', 100)
+        app.config.setdefault('VIEW_LOG_FLUSH_INTERVAL_MS', 500)
+        app.config.setdefault('VIEW_LOG_QUEUE_SIZE', 10000)
+        app.config.setdefault('VIEW_LOG_OVERFLOW', 'drop')  # 'drop' or 'block'
+        app.config.setdefault('VIEW_LOG_BLOCK_TIMEOUT', 1.0)
+
+        if app.config['VIEW_LOG_OVERFLOW'] not in ('drop', 'block'):
+            raise ValueError("VIEW_LOG_OVERFLOW must be 'drop' or 'block'")
+
+        self.app = app
+        self.enabled = app.config['VIEW_LOG_BUFFERED']
+        self.batch_size = app.config['VIEW_LOG_BATCH_SIZE']
+        self.flush_interval = app.config['VIEW_LOG_FLUSH_INTERVAL_MS'] / 1000.0
+        self.overflow = app.config['VIEW_LOG_OVERFLOW']
+        self.block_timeout = app.config['VIEW_LOG_BLOCK_TIMEOUT']
+        self._queue = queue.Queue(maxsize=app.config['VIEW_LOG_QUEUE_SIZE'])
+
+        app.extensions['view_log_buffer'] = self
+        atexit.register(self.shutdown)
+
+    def put(self, row):
+        """Queue a ViewLog row (a dict of column values). Returns False if it was dropped."""
+        self._ensure_started()
+        try:
+            if self.overflow == 'block':
+                self._queue.put(row, timeout=self.block_timeout)
+            else:
+                self._queue.put_nowait(row)
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            return False
+
+        with self._lock:
+            self.queued += 1
+        return True
+
+    def flush(self):
+        """Write everything currently queued. Safe to call from any thread."""
+        while True:
+            batch = self._drain(self.batch_size)
+            if not batch:
+                return
+            self._write(batch)
+
+    def shutdown(self):
+        self._stop.set()
+        if self._thread is not None and self._thread.is_alive():
+            self._thread.join(timeout=5)
+        if self._queue is not None:
+            self.flush()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'queued': self.queued,
+                'flushed': self.flushed,
+                'dropped': self.dropped,
+                'failed': self.failed,
+                'pending': self._queue.qsize() if self._queue is not None else 0,
+            }
+
+    def _ensure_started(self):
+        # Started lazily so that forked workers each get their own flusher
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='view-log-flusher',
+                                            daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while not self._stop.is_set():
+            batch = []
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            if batch:
+                self._write(batch)
+
+    def _drain(self, limit):
+        batch = []
+        while len(batch) < limit:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, batch):
+        from app.extensions import db
+        from app.models import ViewLog, ViewDailyRollup, SiteCounter
+        from app.counters import view_log_deltas
+
+        with self._flush_lock, self.app.app_context():
+            try:
+                with db.engine.begin() as conn:
+                    conn.execute(ViewLog.__table__.insert().values(batch))
+                    ViewDailyRollup.add_views(conn, batch)
+                    SiteCounter.add(conn, view_log_deltas(batch))
+            except Exception as e:
+                self.app.logger.error(f"Error flushing {len(batch)} view logs: {e}")
+                with self._lock:
+                    self.failed += len(batch)
+                return
+
+        with self._lock:
+            self.flushed += len(batch)
+
+
+class ViewCounterBuffer:
+    """Accumulates per-entity view-count deltas and applies them as atomic increments.
+
+    Each flush issues ``UPDATE <table> SET views = views + :n WHERE id = :id``
+    so concurrent workers never overwrite each other's counts.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self.enabled = False
+        self._deltas = {}
+        self._thread = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self.flushed = 0
+        self.failed_flushes = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('VIEW_COUNTER_BUFFERED', True)
+        app.config.setdefault('VIEW_COUNTER_FLUSH_INTERVAL_MS', 1000)
+
+        self.app = app
+        self.enabled = app.config['VIEW_COUNTER_BUFFERED']
+        self.flush_interval = app.config['VIEW_COUNTER_FLUSH_INTERVAL_MS'] / 1000.0
+
+        app.extensions['view_counter_buffer'] = self
+        atexit.register(self.shutdown)
+
+    def increment(self, model, entity_id, n=1):
+        if not self.enabled:
+            self._apply({model.__table__: {entity_id: n}})
+            return
+
+        self._ensure_started()
+        key = (model.__table__, entity_id)
+        with self._lock:
+            self._deltas[key] = self._deltas.get(key, 0) + n
+
+    def pending(self, model, entity_id):
+        """Increments for an entity that have not been written yet."""
+        with self._lock:
+            return self._deltas.get((model.__table__, entity_id), 0)
+
+    def flush(self):
+        with self._flush_lock:
+            with self._lock:
+                deltas, self._deltas = self._deltas, {}
+            if not deltas:
+                return
+
+            by_table = {}
+            for (table, entity_id), n in deltas.items():
+                by_table.setdefault(table, {})[entity_id] = n
+
+            try:
+                self._apply(by_table)
+            except Exception as e:
+                self.app.logger.error(f"Error flushing view counters: {e}")
+                # Put the deltas back so the next flush retries them and no view is lost
+                with self._lock:
+                    for key, n in deltas.items():
+                        self._deltas[key] = self._deltas.get(key, 0) + n
+                    self.failed_flushes += 1
+                return
+
+            with self._lock:
+                self.flushed += sum(deltas.values())
+
+    def shutdown(self):
+        self._stop.set()
+        if self._thread is not None and self._thread.is_alive():
+            self._thread.join(timeout=5)
+        if self.app is not None:
+            self.flush()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'flushed': self.flushed,
+                'pending': sum(self._deltas.values()),
+                'pending_entities': len(self._deltas),
+                'failed_flushes': self.failed_flushes,
+            }
+
+    def _ensure_started(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='view-counter-flusher',
+                                            daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+
+    def _apply(self, by_table):
+        from sqlalchemy import bindparam, func
+        from app.extensions import db
+
+        with self.app.app_context():
+            with db.engine.begin() as conn:
+                for table, deltas in by_table.items():
+                    stmt = table.update()\
+                        .where(table.c.id == bindparam('_id'))\
+                        .values(views=func.coalesce(table.c.views, 0) + bindparam('_n'))
+                    conn.execute(stmt, [{'_id': entity_id, '_n': n}
+                                        for entity_id, n in deltas.items()])
@@ -0,0 +1,420 @@
+import functools
+import inspect
+import os
+import pickle
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+_MISSING = object()
+
+
+class LRUCache:
+    """Thread-safe in-process LRU cache bounded by the total size of its values.
+
+    Entries can carry tags; ``invalidate(*tags)`` drops every entry carrying
+    any of them. Entries also expire after ``ttl`` seconds when one is set.
+    """
+
+    def __init__(self, max_bytes=64 * 1024 * 1024, ttl=None):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._data = OrderedDict()  # key -> (value, size, expires_at, tags)
+        self._tags = {}             # tag -> set of keys
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            if entry[2] is not None and entry[2] <= time.monotonic():
+                self._remove(key)
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key, value, tags=(), ttl=None, size=None):
+        if size is None:
+            size = len(value) if isinstance(value, (str, bytes)) else sys.getsizeof(value)
+        if size > self.max_bytes:
+            return
+        ttl = ttl if ttl is not None else self.ttl
+        expires_at = time.monotonic() + ttl if ttl else None
+        tags = frozenset(tags)
+
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+            self._data[key] = (value, size, expires_at, tags)
+            self._size += size
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            while self._size > self.max_bytes:
+                oldest = next(iter(self._data))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+
+    def invalidate(self, *tags):
+        with self._lock:
+            for tag in tags:
+                for key in list(self._tags.get(tag, ())):
+                    self._remove(key)
+                    self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._tags.clear()
+            self._size = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._data),
+                'bytes': self._size,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+            }
+
+    def _remove(self, key):
+        value, size, expires_at, tags = self._data.pop(key)
+        self._size -= size
+        for tag in tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+
+class PageCache(LRUCache):
+    """Rendered HTML of the public portfolio pages, evicted by model writes.
+
+    Pages are tagged ``user:<id>`` (anything showing the owner),
+    ``portfolio:<user_id>``, ``project:<id>`` and ``blog:<id>``; the mapper
+    hooks below translate a changed row into exactly those tags.
+
+    Other workers learn of a write through PAGE_CACHE_STAMP_DIR: every
+    committed tag's stamp file gets the commit time, and ``get`` drops an
+    entry whose render started before any of its tags' stamps. Pages are
+    stored with that start time (``since``), so a render that raced a
+    commit elsewhere is dropped too. Processes on other hosts see writes
+    within PAGE_CACHE_TTL.
+    """
+
+    def __init__(self, app=None):
+        super().__init__()
+        self.enabled = False
+        self.stamp_dir = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('PAGE_CACHE_ENABLED', True)
+        app.config.setdefault('PAGE_CACHE_MAX_BYTES', 64 * 1024 * 1024)
+        app.config.setdefault('PAGE_CACHE_TTL', 300)
+        app.config.setdefault('PAGE_CACHE_STAMP_DIR',
+                              os.path.join(app.instance_path, 'page-cache-stamps'))
+
+        self.enabled = app.config['PAGE_CACHE_ENABLED']
+        self.max_bytes = app.config['PAGE_CACHE_MAX_BYTES']
+        self.ttl = app.config['PAGE_CACHE_TTL']
+        self.stamp_dir = app.config['PAGE_CACHE_STAMP_DIR']
+        self.clear()
+
+        app.extensions['page_cache'] = self
+        _register_invalidation(self, 'page_cache_tags', _tags_for, on_commit=self.touch_stamps)
+
+    def get(self, key, default=None):
+        entry = super().get(key, _MISSING)
+        if entry is _MISSING:
+            return default
+        value, since, tags = entry
+        if self.stamp_dir and since is not None and \
+                any(self._read_stamp(tag) >= since for tag in tags):
+            with self._lock:
+                if key in self._data:
+                    self._remove(key)
+                self.hits -= 1
+                self.misses += 1
+                self.invalidations += 1
+            return default
+        return value
+
+    def set(self, key, value, tags=(), ttl=None, size=None, since=None):
+        """Store a page rendered from data read no earlier than ``since`` (a ``time.time()``)."""
+        tags = tuple(tags)
+        super().set(key, (value, since, tags), tags=tags, ttl=ttl,
+                    size=size if size is not None else _size_of(value))
+
+    def touch_stamps(self, tags):
+        if not self.stamp_dir:
+            return
+        now = repr(time.time())
+        try:
+            os.makedirs(self.stamp_dir, exist_ok=True)
+            for tag in tags:
+                path = self._stamp_path(tag)
+                # Written whole and renamed into place, so readers never see a partial stamp
+                tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+                with open(tmp_path, 'w') as stamp:
+                    stamp.write(now)
+                os.replace(tmp_path, path)
+        except OSError:
+            pass
+
+    def _read_stamp(self, tag):
+        try:
+            with open(self._stamp_path(tag)) as stamp:
+                return float(stamp.read())
+        except (OSError, ValueError):
+            return 0.0
+
+    def _stamp_path(self, tag):
+        return os.path.join(self.stamp_dir, tag.replace(':', '-'))
+
+
+class QueryCache(LRUCache):
+    """Memoized results of aggregate queries, e.g. the analytics pages.
+
+    Decorate a function with ``@query_cache.memoize(tags=..., ttl=...)``.
+    Keys are the function name plus its bound arguments with defaults
+    applied, so ``f(1)`` and ``f(1, days=30)`` share an entry; callers
+    should normalize free-form input (clamp, round) before calling. ``tags``
+    is a sequence or a callable taking the same arguments. Model writes
+    invalidate ``users``/``projects``/``blog_posts`` and ``user:<id>``;
+    values that follow Core writes (view counts) only expire by TTL.
+    Misses are computed on the primary, never a lagging replica.
+    Cached values must be plain data such as Rows or dicts, never ORM
+    instances, which would outlive their session.
+    """
+
+    def __init__(self, app=None):
+        super().__init__()
+        self.enabled = False
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('QUERY_CACHE_ENABLED', True)
+        app.config.setdefault('QUERY_CACHE_MAX_BYTES', 16 * 1024 * 1024)
+        app.config.setdefault('QUERY_CACHE_TTL', 300)
+
+        self.enabled = app.config['QUERY_CACHE_ENABLED']
+        self.max_bytes = app.config['QUERY_CACHE_MAX_BYTES']
+        self.ttl = app.config['QUERY_CACHE_TTL']
+        self.clear()
+
+        app.extensions['query_cache'] = self
+        _register_invalidation(self, 'query_cache_tags', _query_tags_for)
+
+    def memoize(self, tags=(), ttl=None):
+        def decorator(f):
+            signature = inspect.signature(f)
+
+            @functools.wraps(f)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return f(*args, **kwargs)
+                bound = signature.bind(*args, **kwargs)
+                bound.apply_defaults()
+                key = (f.__module__, f.__qualname__) + tuple(bound.arguments.items())
+
+                value = self.get(key, _MISSING)
+                if value is _MISSING:
+                    from app.routing import use_primary
+                    with use_primary():
+                        value = f(*args, **kwargs)
+                    entry_tags = tags(**bound.arguments) if callable(tags) else tags
+                    self.set(key, value, tags=entry_tags, ttl=ttl, size=_size_of(value))
+                return value
+
+            wrapper.uncached = f
+            return wrapper
+        return decorator
+
+
+class UserCache(LRUCache):
+    """Identity columns of logged-in users, for the Flask-Login user loader.
+
+    Holds only ``IDENTITY_COLUMNS`` per user id; app.identity.UserIdentity
+    loads the full row when anything else is touched. Any committed User
+    write evicts that user here and touches USER_CACHE_STAMP_FILE, whose
+    mtime every worker checks per request, so deactivations and profile
+    edits reach the other processes on this host straight away. Processes
+    on other hosts see them within USER_CACHE_TTL.
+    """
+
+    def __init__(self, app=None):
+        super().__init__()
+        self.enabled = False
+        self.stamp_file = None
+        self._stamp = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('USER_CACHE_ENABLED', True)
+        app.config.setdefault('USER_CACHE_MAX_BYTES', 4 * 1024 * 1024)
+        app.config.setdefault('USER_CACHE_TTL', 300)
+        app.config.setdefault('USER_CACHE_STAMP_FILE',
+                              os.path.join(app.instance_path, 'user-cache.stamp'))
+
+        self.enabled = app.config['USER_CACHE_ENABLED']
+        self.max_bytes = app.config['USER_CACHE_MAX_BYTES']
+        self.ttl = app.config['USER_CACHE_TTL']
+        self.stamp_file = app.config['USER_CACHE_STAMP_FILE']
+        self._stamp = self._read_stamp()
+        self.clear()
+
+        app.extensions['user_cache'] = self
+        _register_invalidation(self, 'user_cache_tags', _user_tags_for,
+                               on_commit=lambda tags: self.touch_stamp())
+
+    def load(self, user_id):
+        """Return a UserIdentity for an active user, or None."""
+        from app.identity import IDENTITY_COLUMNS, UserIdentity, load_identity_values
+
+        if not self.enabled:
+            values = load_identity_values(user_id)
+        else:
+            stamp = self._read_stamp()
+            if stamp != self._stamp:
+                self._stamp = stamp
+                self.clear()
+            values = self.get(user_id)
+            if values is None:
+                values = load_identity_values(user_id)
+                if values is not None:
+                    self.set(user_id, values, tags=[f'user:{user_id}'], size=512)
+
+        if values is None:
+            return None
+        identity = UserIdentity(dict(zip(IDENTITY_COLUMNS, values)))
+        # Deactivated accounts are logged out on their next request
+        return identity if identity.is_active else None
+
+    def touch_stamp(self):
+        if not self.stamp_file:
+            return
+        # The size changes on every touch too, for filesystems with coarse mtimes
+        try:
+            with open(self.stamp_file, 'ab') as stamp:
+                if stamp.tell() >= 4096:
+                    stamp.truncate(0)
+                else:
+                    stamp.write(b'.')
+        except OSError:
+            pass
+        self._stamp = self._read_stamp()
+
+    def _read_stamp(self):
+        if not self.stamp_file:
+            return None
+        try:
+            stat = os.stat(self.stamp_file)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+
+def _size_of(value):
+    try:
+        return len(pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        return sys.getsizeof(value)
+
+
+def _tags_for(target):
+    from app.models import User, Project, BlogPost, Skill, Achievement
+
+    if isinstance(target, User):
+        return [f'user:{target.id}']
+    if isinstance(target, Project):
+        return [f'portfolio:{target.user_id}', f'project:{target.id}']
+    if isinstance(target, BlogPost):
+        return [f'portfolio:{target.user_id}', f'blog:{target.id}']
+    if isinstance(target, (Skill, Achievement)):
+        return [f'portfolio:{target.user_id}']
+    return []
+
+
+def _user_tags_for(target):
+    from app.models import User
+
+    if isinstance(target, User):
+        return [f'user:{target.id}']
+    return []
+
+
+def _query_tags_for(target):
+    from app.models import User, Project, BlogPost
+
+    if isinstance(target, User):
+        return ['users', f'user:{target.id}']
+    if isinstance(target, Project):
+        return ['projects', f'user:{target.user_id}']
+    if isinstance(target, BlogPost):
+        return ['blog_posts', f'user:{target.user_id}']
+    return []
+
+
+_registered = set()
+
+
+def _register_invalidation(cache, info_key, tags_for, on_commit=None):
+    # create_app may run more than once per process; hook each cache once
+    if info_key in _registered:
+        return
+    _registered.add(info_key)
+
+    from sqlalchemy import event
+    from sqlalchemy.orm import Session, object_session
+    from app.models import User, Project, BlogPost, Skill, Achievement
+
+    def evict(mapper, connection, target):
+        tags = tags_for(target)
+        if not tags:
+            return
+        cache.invalidate(*tags)
+        # Evict again once the write is visible, in case a concurrent request
+        # re-rendered from the old rows between the flush and the commit
+        session = object_session(target)
+        if session is not None:
+            session.info.setdefault(info_key, set()).update(tags)
+
+    for model in (User, Project, BlogPost, Skill, Achievement):
+        for name in ('after_insert', 'after_update', 'after_delete'):
+            event.listen(model, name, evict)
+
+    @event.listens_for(Session, 'after_commit')
+    def evict_after_commit(session):
+        tags = session.info.pop(info_key, None)
+        if tags:
+            cache.invalidate(*tags)
+            if on_commit is not None:
+                on_commit(tags)
+
+    @event.listens_for(Session, 'after_rollback')
+    def discard_tags(session):
+        session.info.pop(info_key, None)
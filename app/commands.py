@@ -0,0 +1,256 @@
+import click
+from flask.cli import with_appcontext
+from app.extensions import db
+
+
+@click.command('backfill-view-rollups')
+@with_appcontext
+def backfill_view_rollups():
+    """Rebuild view_daily_rollup from the raw view_logs table."""
+    from app.models import ViewLog, ViewDailyRollup
+
+    day = db.func.date(ViewLog.timestamp)
+    select = db.select(
+        ViewLog.user_id,
+        ViewLog.entity_type,
+        ViewLog.entity_id,
+        day,
+        db.func.count(ViewLog.id)
+    ).where(
+        ViewLog.user_id.isnot(None),
+        ViewLog.timestamp.isnot(None)
+    ).group_by(
+        ViewLog.user_id, ViewLog.entity_type, ViewLog.entity_id, day
+    )
+
+    table = ViewDailyRollup.__table__
+    with db.engine.begin() as conn:
+        conn.execute(table.delete())
+        conn.execute(table.insert().from_select(
+            ['user_id', 'entity_type', 'entity_id', 'day', 'count'], select
+        ))
+        rows = conn.execute(db.select(db.func.count()).select_from(table)).scalar()
+
+    click.echo(f'Rebuilt {rows} daily view rollup rows.')
+
+
+@click.command('check-query-plans')
+def check_query_plans_command():
+    """Fail if a main/portfolio/admin route full-scans a table or cannot be checked."""
+    from app import create_app
+    from app.query_plans import check_query_plans
+
+    findings, failures = check_query_plans(create_app('testing'))
+    for endpoint, table, statement, plan in findings:
+        click.echo(f'{endpoint}: full scan of {table}')
+        click.echo(f'    {" ".join(statement.split())}')
+        for detail in plan:
+            click.echo(f'      {detail}')
+    for endpoint, method, url, error in failures:
+        click.echo(f'{endpoint}: {method} {url} failed, not checked')
+        click.echo(f'    {error}')
+
+    if findings or failures:
+        raise SystemExit(1)
+    click.echo('No full table scans found.')
+
+
+@click.command('reprocess-images')
+@click.option('--subfolder', multiple=True, help='Only this upload subfolder (repeatable).')
+@click.option('--force', is_flag=True, help='Regenerate derivatives that already exist.')
+@click.option('--workers', type=int, default=None, help='Worker processes (default: one per core).')
+@with_appcontext
+def reprocess_images(subfolder, force, workers):
+    """Generate missing image thumbnails and srcset ladders for existing uploads in parallel."""
+    from flask import current_app
+    from app.images import reprocess_uploads
+
+    processed, failed = reprocess_uploads(
+        current_app.config['UPLOAD_FOLDER'],
+        subfolder or ('profiles', 'projects', 'achievements'),
+        size=current_app.config['THUMBNAIL_SIZE'],
+        widths=current_app.config['IMAGE_DERIVATIVE_WIDTHS'],
+        formats=current_app.config['IMAGE_DERIVATIVE_FORMATS'],
+        quality=current_app.config['IMAGE_QUALITY'],
+        force=force,
+        workers=workers
+    )
+    click.echo(f'Processed {processed} images, {failed} failed.')
+
+
+@click.command('rebuild-search-index')
+@with_appcontext
+def rebuild_search_index():
+    """Rebuild the full-text index of public projects and published posts."""
+    from app.search import is_available, rebuild_index
+
+    with db.engine.begin() as conn:
+        if not is_available(conn):
+            raise click.ClickException('Full-text search requires SQLite with FTS5.')
+        count = rebuild_index(conn)
+    click.echo(f'Indexed {count} documents.')
+
+
+@click.command('sync-technologies')
+@with_appcontext
+def sync_technologies():
+    """Rebuild project technology links from tech_stack and recount every technology."""
+    from app.models import Project
+    from app.technologies import refresh_counts
+
+    projects = Project.query.options(db.selectinload(Project.technologies)).all()
+    for project in projects:
+        project.sync_technologies()
+    db.session.commit()
+
+    refresh_counts(db.session.connection())
+    db.session.commit()
+    click.echo(f'Synced technologies for {len(projects)} projects.')
+
+
+@click.command('reconcile-site-counters')
+@with_appcontext
+def reconcile_site_counters():
+    """Recount the admin dashboard counters from the source tables."""
+    from app.counters import reconcile
+
+    with db.engine.begin() as conn:
+        totals = reconcile(conn)
+    for name, (before, after) in totals.items():
+        drift = f' (was {before})' if before != after else ''
+        click.echo(f'{name}: {after}{drift}')
+
+
+@click.command('rerender-content')
+@click.option('--all', 'rerender_all', is_flag=True, help='Re-render every row, not only stale ones.')
+@click.option('--batch-size', type=int, default=500, show_default=True)
+@with_appcontext
+def rerender_content(rerender_all, batch_size):
+    """Re-render derived HTML, summaries and counts of projects and blog posts."""
+    from app.models import Project, BlogPost
+    from app.rendering import RENDERER_VERSION, project_fields, post_fields
+
+    jobs = (
+        (Project, (Project.description, Project.short_description), project_fields),
+        (BlogPost, (BlogPost.content, BlogPost.excerpt), post_fields),
+    )
+    for model, sources, render in jobs:
+        table = model.__table__
+        stale = db.or_(table.c.render_version.is_(None), table.c.render_version < RENDERER_VERSION)
+        last_id = 0
+        count = 0
+        while True:
+            criteria = [table.c.id > last_id] if rerender_all else [table.c.id > last_id, stale]
+            rows = db.session.execute(
+                db.select(table.c.id, *sources).where(*criteria)
+                .order_by(table.c.id).limit(batch_size)
+            ).all()
+            if not rows:
+                break
+            # Core executemany, so updated_at and the write hooks are left alone
+            # and re-rendering doesn't look like an edit
+            values = [dict(render(row[1], row[2]), _id=row[0]) for row in rows]
+            db.session.execute(
+                table.update().where(table.c.id == db.bindparam('_id'))
+                .values({**{name: db.bindparam(name) for name in values[0] if name != '_id'},
+                         'updated_at': table.c.updated_at}),
+                values
+            )
+            db.session.commit()
+            last_id = rows[-1][0]
+            count += len(rows)
+        click.echo(f'Re-rendered {count} {table.name}.')
+
+
+@click.command('benchmark-sqlite')
+@click.option('--readers', type=int, default=8, help='Concurrent reader threads.')
+@click.option('--writers', type=int, default=2, help='Concurrent view-writer threads.')
+@click.option('--duration', type=float, default=5.0, help='Seconds per profile.')
+@with_appcontext
+def benchmark_sqlite(readers, writers, duration):
+    """Compare public-page read throughput under concurrent view writes for each SQLite profile."""
+    from app.sqlite import PROFILES, benchmark
+
+    click.echo(f'{readers} readers, {writers} writers, {duration:g}s per profile on a scratch database')
+    click.echo(f'{"profile":<12}{"reads/s":>10}{"writes/s":>10}{"p50 ms":>9}{"p95 ms":>9}{"errors":>8}')
+    for profile in PROFILES:
+        result = benchmark(profile, readers=readers, writers=writers, duration=duration)
+        click.echo(f'{profile:<12}{result["reads_per_sec"]:>10}{result["writes_per_sec"]:>10}'
+                   f'{result["read_p50_ms"]!s:>9}{result["read_p95_ms"]!s:>9}'
+                   f'{result["read_errors"] + result["write_errors"]:>8}')
+
+
+@click.command('sync-replicas')
+@with_appcontext
+def sync_replicas():
+    """Copy a SQLite primary database into the SQLite replica files (local read/write split testing)."""
+    from app.routing import sync_sqlite_replicas
+
+    copied = sync_sqlite_replicas(db)
+    if not copied:
+        raise click.ClickException('No SQLite replica binds to copy into.')
+    click.echo(f'Copied the primary into {", ".join(copied)}.')
+
+
+@click.command('expire-uploads')
+@click.option('--older-than', type=int, default=None,
+              help='Seconds an upload may stay unreferenced (default: UPLOAD_PENDING_TTL).')
+@with_appcontext
+def expire_uploads(older_than):
+    """Remove uploads that nothing has referenced for longer than the pending TTL."""
+    from flask import current_app
+    from app.storage import expire_pending_uploads
+
+    ttl = older_than if older_than is not None else current_app.config['UPLOAD_PENDING_TTL']
+    click.echo(f'Removed {expire_pending_uploads(ttl)} unreferenced uploads.')
+
+
+@click.command('move-uploads')
+@click.option('--source', default=None,
+              help='Old upload folder (default: app/static/uploads).')
+@with_appcontext
+def move_uploads(source):
+    """Move uploads from the old app/static/uploads folder into UPLOAD_FOLDER."""
+    import os
+    import shutil
+    from flask import current_app
+    from app.media import MEDIA_SUBFOLDERS
+
+    source = source or os.path.join(current_app.root_path, 'static', 'uploads')
+    target = current_app.config['UPLOAD_FOLDER']
+    if os.path.abspath(source) == os.path.abspath(target):
+        raise click.ClickException('UPLOAD_FOLDER is already the old upload folder.')
+
+    moved = skipped = 0
+    for subfolder in MEDIA_SUBFOLDERS:
+        old_dir = os.path.join(source, subfolder)
+        if not os.path.isdir(old_dir):
+            continue
+        new_dir = os.path.join(target, subfolder)
+        os.makedirs(new_dir, exist_ok=True)
+        for name in os.listdir(old_dir):
+            old_path = os.path.join(old_dir, name)
+            new_path = os.path.join(new_dir, name)
+            if not os.path.isfile(old_path):
+                continue
+            # Names are content hashes or UUIDs, so an existing file is the same upload
+            if os.path.exists(new_path):
+                skipped += 1
+                continue
+            shutil.move(old_path, new_path)
+            moved += 1
+    click.echo(f'Moved {moved} files into {target} ({skipped} already there).')
+
+
+def register_commands(app):
+    app.cli.add_command(backfill_view_rollups)
+    app.cli.add_command(reprocess_images)
+    app.cli.add_command(rebuild_search_index)
+    app.cli.add_command(sync_technologies)
+    app.cli.add_command(reconcile_site_counters)
+    app.cli.add_command(rerender_content)
+    app.cli.add_command(check_query_plans_command)
+    app.cli.add_command(benchmark_sqlite)
+    app.cli.add_command(sync_replicas)
+    app.cli.add_command(expire_uploads)
+    app.cli.add_command(move_uploads)
@@ -11,11 +11,45 @@ class Config:
         f"sqlite:///{os.path.join(basedir, '..', 'devfolio.db')}"
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     
-    # File upload settings
-    UPLOAD_FOLDER = os.path.join(basedir, '..', 'app', 'static', 'uploads')
+    # SQLite connection profile (app/sqlite.py): 'production' enables WAL and tuned pragmas
+    SQLITE_PROFILE = os.environ.get('SQLITE_PROFILE') or 'default'
+    SQLITE_POOL_SIZE = int(os.environ.get('SQLITE_POOL_SIZE') or 10)
+    
+    # Read replicas (app/routing.py): comma-separated URLs, used by read-only public routes
+    SQLALCHEMY_BINDS = {f'replica{i}': url for i, url in
+                        enumerate(filter(None, (os.environ.get('DATABASE_REPLICA_URLS') or '').split(',')))}
+    SQLALCHEMY_REPLICA_BINDS = list(SQLALCHEMY_BINDS)
+    SQLALCHEMY_REPLICA_STICKY_SECONDS = int(os.environ.get('SQLALCHEMY_REPLICA_STICKY_SECONDS') or 10)
+    
+    # File upload settings; kept out of app/static so uploads are only reachable through /media
+    UPLOAD_FOLDER = os.environ.get('UPLOAD_FOLDER') or os.path.join(basedir, '..', 'instance', 'uploads')
     MAX_CONTENT_LENGTH = int(os.environ.get('MAX_CONTENT_LENGTH') or 16777216)
     ALLOWED_EXTENSIONS = {'jpg', 'jpeg', 'png', 'gif', 'webp', 'pdf', 'mp4', 'mov'}
     
+    UPLOAD_STORAGE = os.environ.get('UPLOAD_STORAGE') or 'content'  # 'content' or 'uuid'
+    # /api/upload files nothing references are removed by `flask expire-uploads` after this long
+    UPLOAD_PENDING_TTL = int(os.environ.get('UPLOAD_PENDING_TTL') or 86400)
+    
+    # Image derivatives are generated in a process pool after the upload is saved
+    IMAGE_PIPELINE_ASYNC = os.environ.get('IMAGE_PIPELINE_ASYNC', 'true').lower() == 'true'
+    IMAGE_WORKERS = int(os.environ['IMAGE_WORKERS']) if os.environ.get('IMAGE_WORKERS') else None
+    THUMBNAIL_SIZE = (300, 300)
+    # Responsive ladder: every width below the source, in each format ('original' keeps the upload's)
+    IMAGE_DERIVATIVE_WIDTHS = tuple(int(w) for w in (os.environ.get('IMAGE_DERIVATIVE_WIDTHS')
+                                                     or '320,640,960,1280,1920').split(','))
+    IMAGE_DERIVATIVE_FORMATS = tuple((os.environ.get('IMAGE_DERIVATIVE_FORMATS') or 'webp,original').split(','))
+    IMAGE_QUALITY = int(os.environ.get('IMAGE_QUALITY') or 82)
+    
+    # On-demand resizes (/img/<w>x<h>/...): only these boxes, cached on disk under a byte budget
+    IMAGE_RESIZE_SIZES = tuple((os.environ.get('IMAGE_RESIZE_SIZES') or '160x160,320x240,640x480,1280x720').split(','))
+    IMAGE_RESIZE_CACHE_MAX_BYTES = int(os.environ.get('IMAGE_RESIZE_CACHE_MAX_BYTES') or 268435456)
+    
+    # Upload serving: 'python' streams with range support, 'x-accel' (nginx) and
+    # 'x-sendfile' (Apache/lighttpd) hand the transfer to the front proxy
+    MEDIA_SERVE_MODE = os.environ.get('MEDIA_SERVE_MODE') or 'python'
+    MEDIA_ACCEL_PREFIX = os.environ.get('MEDIA_ACCEL_PREFIX') or '/protected-uploads/'
+    MEDIA_MAX_AGE = int(os.environ.get('MEDIA_MAX_AGE') or 3600)
+    
     # Security
     WTF_CSRF_ENABLED = True
     WTF_CSRF_SECRET_KEY = os.environ.get('WTF_CSRF_SECRET_KEY') or 'csrf-secret-key'
@@ -26,6 +60,41 @@ class Config:
     SESSION_COOKIE_HTTPONLY = True
     SESSION_COOKIE_SAMESITE = 'Lax'
     
+    # View logging (buffered, flushed in bulk by a background thread)
+    VIEW_LOG_BUFFERED = os.environ.get('VIEW_LOG_BUFFERED', 'true').lower() == 'true'
+    VIEW_LOG_BATCH_SIZE = int(os.environ.get('VIEW_LOG_BATCH_SIZE') or 100)
+    VIEW_LOG_FLUSH_INTERVAL_MS = int(os.environ.get('VIEW_LOG_FLUSH_INTERVAL_MS') or 500)
+    VIEW_LOG_QUEUE_SIZE = int(os.environ.get('VIEW_LOG_QUEUE_SIZE') or 10000)
+    VIEW_LOG_OVERFLOW = os.environ.get('VIEW_LOG_OVERFLOW') or 'drop'  # 'drop' or 'block'
+    VIEW_COUNTER_BUFFERED = os.environ.get('VIEW_COUNTER_BUFFERED', 'true').lower() == 'true'
+    VIEW_COUNTER_FLUSH_INTERVAL_MS = int(os.environ.get('VIEW_COUNTER_FLUSH_INTERVAL_MS') or 1000)
+    
+    # Rendered-page cache for public portfolio pages
+    PAGE_CACHE_ENABLED = os.environ.get('PAGE_CACHE_ENABLED', 'true').lower() == 'true'
+    PAGE_CACHE_MAX_BYTES = int(os.environ.get('PAGE_CACHE_MAX_BYTES') or 67108864)
+    PAGE_CACHE_TTL = int(os.environ.get('PAGE_CACHE_TTL') or 300)
+    # Per-tag commit stamps shared by the workers on this host
+    PAGE_CACHE_STAMP_DIR = os.environ.get('PAGE_CACHE_STAMP_DIR') or \
+        os.path.join(basedir, '..', 'instance', 'page-cache-stamps')
+    
+    # Memoized analytics queries, invalidated by model writes
+    QUERY_CACHE_ENABLED = os.environ.get('QUERY_CACHE_ENABLED', 'true').lower() == 'true'
+    QUERY_CACHE_MAX_BYTES = int(os.environ.get('QUERY_CACHE_MAX_BYTES') or 16777216)
+    QUERY_CACHE_TTL = int(os.environ.get('QUERY_CACHE_TTL') or 300)
+    
+    # Identity cache behind the Flask-Login user loader
+    USER_CACHE_ENABLED = os.environ.get('USER_CACHE_ENABLED', 'true').lower() == 'true'
+    USER_CACHE_TTL = int(os.environ.get('USER_CACHE_TTL') or 300)
+    
+    # Password hashing (werkzeug method string, run in a bounded thread pool)
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD') or 'scrypt:32768:8:1'
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS') or 2)
+    PASSWORD_HASH_MAX_PENDING = int(os.environ.get('PASSWORD_HASH_MAX_PENDING') or 32)
+    
+    # Per-request SQL/template profiling with Server-Timing headers and /admin/perf
+    PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED', 'false').lower() == 'true'
+    PROFILING_N_PLUS_ONE_THRESHOLD = int(os.environ.get('PROFILING_N_PLUS_ONE_THRESHOLD') or 5)
+    
     # Admin
     ADMIN_EMAILS = os.environ.get('ADMIN_EMAILS', 'admin@devfolio.com').split(',')
     DEBUG = os.environ.get('FLASK_ENV') == 'development'
@@ -38,12 +107,25 @@ class DevelopmentConfig(Config):
     DEBUG = True
     SQLALCHEMY_ECHO = True
 
+class TestingConfig(Config):
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'
+    WTF_CSRF_ENABLED = False
+    VIEW_LOG_BUFFERED = False
+    VIEW_COUNTER_BUFFERED = False
+    IMAGE_PIPELINE_ASYNC = False
+    PASSWORD_HASH_METHOD = 'pbkdf2:sha256:1000'
+    USER_CACHE_STAMP_FILE = None
+    PAGE_CACHE_STAMP_DIR = None
+
 class ProductionConfig(Config):
     DEBUG = False
     SESSION_COOKIE_SECURE = True
+    SQLITE_PROFILE = os.environ.get('SQLITE_PROFILE') or 'production'
 
 config = {
     'development': DevelopmentConfig,
+    'testing': TestingConfig,
     'production': ProductionConfig,
     'default': DevelopmentConfig
 }
\ No newline at end of file
@@ -0,0 +1,104 @@
+"""Site-wide entity counters for the admin dashboard.
+
+ORM inserts and deletes of the counted models are folded into per-flush
+deltas and written to ``site_counters`` in the same transaction, so a
+rolled-back request never moves a counter. View logs written by the
+background buffer bypass the ORM and call ``SiteCounter.add`` themselves.
+Bulk Core deletes are not seen here; ``flask reconcile-site-counters``
+rebuilds the table from the source rows.
+"""
+from datetime import datetime
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+
+# counter name -> (model name, timestamp column)
+COUNTERS = {
+    'users': ('User', 'created_at'),
+    'projects': ('Project', 'created_at'),
+    'blog_posts': ('BlogPost', 'created_at'),
+    'view_logs': ('ViewLog', 'timestamp'),
+}
+
+
+def _models():
+    from app import models
+    return {name: (getattr(models, model), column)
+            for name, (model, column) in COUNTERS.items()}
+
+
+def view_log_deltas(rows):
+    """Counter deltas for ViewLog rows given as dicts of column values."""
+    deltas = {}
+    for row in rows:
+        key = ('view_logs', (row.get('timestamp') or datetime.utcnow()).date())
+        deltas[key] = deltas.get(key, 0) + 1
+    return deltas
+
+
+def reconcile(connection):
+    """Rebuild every counter from the source tables; returns {name: (old, new)} totals."""
+    from app.extensions import db
+    from app.models import SiteCounter
+
+    table = SiteCounter.__table__
+    before = {name: count for name, count in connection.execute(
+        db.select(table.c.name, table.c.count).where(table.c.day == SiteCounter.TOTAL_DAY)
+    )}
+
+    deltas = {}
+    for name, (model, column) in _models().items():
+        day = db.func.date(getattr(model, column))
+        for value, count in connection.execute(
+                db.select(day, db.func.count()).select_from(model).group_by(day)):
+            if value is None:
+                continue
+            if isinstance(value, str):
+                value = datetime.strptime(value, '%Y-%m-%d').date()
+            deltas[(name, value)] = count
+
+    connection.execute(table.delete())
+    SiteCounter.add(connection, deltas)
+
+    after = {}
+    for (name, _), count in deltas.items():
+        after[name] = after.get(name, 0) + count
+    return {name: (before.get(name, 0), after.get(name, 0)) for name in COUNTERS}
+
+
+_registered = False
+
+
+def register_counter_hooks(db):
+    global _registered
+    if _registered:
+        return
+    _registered = True
+
+    from app.models import SiteCounter
+
+    def track(delta):
+        def listener(mapper, connection, target):
+            session = object_session(target)
+            if session is None:
+                return
+            name, column = names[type(target)]
+            day = (getattr(target, column) or datetime.utcnow()).date()
+            deltas = session.info.setdefault('site_counters', {})
+            deltas[(name, day)] = deltas.get((name, day), 0) + delta
+        return listener
+
+    names = {}
+    for name, (model, column) in _models().items():
+        names[model] = (name, column)
+        event.listen(model, 'after_insert', track(1))
+        event.listen(model, 'after_delete', track(-1))
+
+    @event.listens_for(Session, 'after_flush')
+    def write_counters(session, flush_context):
+        deltas = session.info.pop('site_counters', None)
+        if deltas:
+            SiteCounter.add(session.connection(), deltas)
+
+    @event.listens_for(Session, 'after_rollback')
+    def discard_counters(session):
+        session.info.pop('site_counters', None)
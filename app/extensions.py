@@ -2,8 +2,26 @@ from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
 from flask_migrate import Migrate
 from flask_wtf.csrf import CSRFProtect
+from app.buffers import ViewLogBuffer, ViewCounterBuffer
+from app.cache import PageCache, QueryCache, UserCache
+from app.images import ImagePipeline
+from app.resize import ImageResizer
+from app.passwords import PasswordHasher
+from app.availability import AvailabilityIndex
+from app.routing import RoutingSession
+from app.profiling import RequestProfiler
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 login_manager = LoginManager()
 migrate = Migrate()
-csrf = CSRFProtect()
\ No newline at end of file
+csrf = CSRFProtect()
+view_log_buffer = ViewLogBuffer()
+view_counter_buffer = ViewCounterBuffer()
+page_cache = PageCache()
+query_cache = QueryCache()
+user_cache = UserCache()
+image_pipeline = ImagePipeline()
+password_hasher = PasswordHasher()
+availability_index = AvailabilityIndex()
+image_resizer = ImageResizer()
+profiler = RequestProfiler()
\ No newline at end of file
@@ -0,0 +1,63 @@
+from flask_login import UserMixin
+from sqlalchemy.orm import make_transient_to_detached
+
+# What the layout, permission checks and ownership tests read on every request
+IDENTITY_COLUMNS = ('id', 'username', 'email', 'full_name', 'tagline', 'profile_pic',
+                    'is_active', 'is_admin')
+
+
+def load_identity_values(user_id):
+    from app.extensions import db
+    from app.models import User
+    from app.routing import use_primary
+
+    # Cached until the next User write, so never read from a lagging replica
+    with use_primary():
+        row = db.session.execute(
+            db.select(*[getattr(User, column) for column in IDENTITY_COLUMNS])
+            .where(User.id == user_id)
+        ).first()
+    return tuple(row) if row is not None else None
+
+
+class UserIdentity(UserMixin):
+    """Stand-in for ``current_user`` built from the identity columns alone.
+
+    Anything else (``bio``, the dynamic relationships, methods) is delegated
+    to a User instance attached to the session from the identity columns,
+    without a query; its other columns are expired and load together on
+    first access. Assignments go to that instance, so view code can keep
+    treating ``current_user`` as the model it edits and commits.
+    """
+
+    def __init__(self, values):
+        object.__setattr__(self, '_values', values)
+        object.__setattr__(self, '_user', None)
+
+    @property
+    def user(self):
+        if self._user is None:
+            from app.extensions import db
+            from app.models import User
+            user = User(**self._values)
+            make_transient_to_detached(user)
+            object.__setattr__(self, '_user', db.session.merge(user, load=False))
+        return self._user
+
+    @property
+    def is_active(self):
+        return self._values['is_active'] is not False
+
+    def __getattr__(self, name):
+        values = self.__dict__['_values']
+        if name in values:
+            return values[name]
+        return getattr(self.user, name)
+
+    def __setattr__(self, name, value):
+        setattr(self.user, name, value)
+        if name in self._values:
+            self._values[name] = value
+
+    def __repr__(self):
+        return f"<UserIdentity {self._values['id']} {self._values['username']!r}>"
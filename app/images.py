@@ -0,0 +1,367 @@
+import atexit
+import json
+import mimetypes
+import multiprocessing
+import os
+import re
+import signal
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from markupsafe import Markup, escape
+
+IMAGE_EXTENSIONS = {'jpg', 'jpeg', 'png', 'gif', 'webp'}
+
+MANIFEST_VERSION = 1
+
+_DERIVATIVE = re.compile(r'_(?:thumb|w\d+)$')
+
+_SAVE_OPTIONS = {
+    'jpeg': {'optimize': True, 'progressive': True},
+    'png': {'optimize': True},
+    'webp': {'method': 4},
+}
+
+
+def is_image(filename):
+    return '.' in filename and filename.rsplit('.', 1)[1].lower() in IMAGE_EXTENSIONS
+
+
+def thumbnail_path(image_path):
+    dir_name, file_name = os.path.split(image_path)
+    name, ext = os.path.splitext(file_name)
+    return os.path.join(dir_name, f"{name}_thumb{ext}")
+
+
+def manifest_path(image_path):
+    return os.path.splitext(image_path)[0] + '_srcset.json'
+
+
+def derivative_name(filename, width, fmt):
+    name, ext = os.path.splitext(filename)
+    if fmt == 'original':
+        return f"{name}_w{width}{ext}"
+    return f"{name}_w{width}.{fmt}"
+
+
+def make_thumbnail(image_path, size=(300, 300)):
+    """Write the ``_thumb`` copy of an image and return its path.
+
+    Pure function with no Flask state, so it can run in a worker process.
+    """
+    from PIL import Image
+
+    with Image.open(image_path) as img:
+        img.thumbnail(tuple(size), Image.Resampling.LANCZOS)
+        path = thumbnail_path(image_path)
+        img.save(path)
+    return path
+
+
+def make_derivatives(image_path, thumbnail_size=(300, 300), widths=(), formats=('original',),
+                     quality=82):
+    """Write the thumbnail and the responsive width/format ladder of an image.
+
+    Each width narrower than the source is produced in each format
+    ('original' meaning the upload's own format); a source narrower than the
+    widest rung is also re-encoded at its own width. Animated images only
+    get the thumbnail. The manifest is written last, so its presence means
+    every file it lists is on disk. Returns the manifest.
+
+    Pure function with no Flask state, so it can run in a worker process.
+    """
+    from PIL import Image, ImageOps
+
+    make_thumbnail(image_path, thumbnail_size)
+
+    dir_name, file_name = os.path.split(image_path)
+    derivatives = []
+    with Image.open(image_path) as source:
+        source_width, source_height = source.size
+        if not getattr(source, 'is_animated', False):
+            img = ImageOps.exif_transpose(source)
+            source_width, source_height = img.size
+            ladder = sorted({w for w in widths if w < source_width})
+            if widths and source_width <= max(widths):
+                ladder.append(source_width)
+
+            for width in ladder:
+                height = max(round(source_height * width / source_width), 1)
+                resized = img if width == source_width else img.resize((width, height), Image.Resampling.LANCZOS)
+                for fmt in formats:
+                    name = derivative_name(file_name, width, fmt)
+                    out = resized
+                    if fmt != 'original' and out.mode not in ('RGB', 'RGBA'):
+                        out = out.convert('RGBA' if out.has_transparency_data else 'RGB')
+                    save_format = Image.registered_extensions()[os.path.splitext(name)[1].lower()]
+                    out.save(os.path.join(dir_name, name), quality=quality,
+                             **_SAVE_OPTIONS.get(save_format.lower(), {}))
+                    derivatives.append({
+                        'file': name,
+                        'width': width,
+                        'height': height,
+                        'type': mimetypes.guess_type(name)[0],
+                        'bytes': os.path.getsize(os.path.join(dir_name, name)),
+                    })
+
+    manifest = {
+        'version': MANIFEST_VERSION,
+        'source': file_name,
+        'width': source_width,
+        'height': source_height,
+        'thumbnail': os.path.basename(thumbnail_path(image_path)),
+        'derivatives': derivatives,
+    }
+    path = manifest_path(image_path)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, path)
+    return manifest
+
+
+def derivative_paths(image_path, widths=(), formats=()):
+    """Every file derived from an image: thumbnail, manifest, the ladder it lists,
+    and the rungs the current settings would produce (for jobs that never finished)."""
+    dir_name, file_name = os.path.split(image_path)
+    paths = {thumbnail_path(image_path), manifest_path(image_path)}
+    manifest = load_manifest(image_path)
+    if manifest is not None:
+        paths.update(os.path.join(dir_name, d['file']) for d in manifest['derivatives'])
+    for width in widths:
+        for fmt in formats:
+            paths.add(os.path.join(dir_name, derivative_name(file_name, width, fmt)))
+    return sorted(paths)
+
+
+def load_manifest(image_path):
+    try:
+        mtime = os.stat(manifest_path(image_path)).st_mtime_ns
+    except OSError:
+        return None
+    return _read_manifest(manifest_path(image_path), mtime)
+
+
+@lru_cache(maxsize=4096)
+def _read_manifest(path, mtime):
+    try:
+        with open(path) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return manifest if manifest.get('version') == MANIFEST_VERSION else None
+
+
+def _worker_pool(workers):
+    """Process pool for ``make_derivatives``.
+
+    Always spawned, not forked: the web process is multi-threaded, and a
+    forked child would inherit its locks mid-use. Spawned workers only
+    import what unpickling the job needs (this module and Pillow); run.py
+    skips building the app when re-imported as ``__mp_main__``.
+    """
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                               initializer=_init_worker)
+
+
+def _init_worker():
+    # Ctrl-C is for the parent, which shuts the pool down
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+class ImagePipeline:
+    """Runs image derivative jobs in a process pool off the request thread.
+
+    Job status is tracked per (subfolder, filename) for uploads submitted by
+    this process; anything else is reported from what exists on disk.
+    """
+
+    PENDING = 'pending'
+    DONE = 'done'
+    FAILED = 'failed'
+    MISSING = 'missing'
+
+    def __init__(self, app=None):
+        self.app = None
+        self.enabled = False
+        self._executor = None
+        self._status = OrderedDict()
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('IMAGE_PIPELINE_ASYNC', True)
+        app.config.setdefault('IMAGE_WORKERS', None)  # None means one per core
+        app.config.setdefault('THUMBNAIL_SIZE', (300, 300))
+        app.config.setdefault('IMAGE_DERIVATIVE_WIDTHS', (320, 640, 960, 1280, 1920))
+        app.config.setdefault('IMAGE_DERIVATIVE_FORMATS', ('webp', 'original'))
+        app.config.setdefault('IMAGE_QUALITY', 82)
+        app.config.setdefault('IMAGE_STATUS_MAX_ENTRIES', 10000)
+
+        self.app = app
+        self.enabled = app.config['IMAGE_PIPELINE_ASYNC']
+        self.thumbnail_size = tuple(app.config['THUMBNAIL_SIZE'])
+        self.widths = tuple(app.config['IMAGE_DERIVATIVE_WIDTHS'])
+        self.formats = tuple(app.config['IMAGE_DERIVATIVE_FORMATS'])
+        self.quality = app.config['IMAGE_QUALITY']
+        self.max_entries = app.config['IMAGE_STATUS_MAX_ENTRIES']
+
+        app.extensions['image_pipeline'] = self
+        app.add_template_global(thumbnail_url)
+        app.add_template_global(image_srcset)
+        app.add_template_global(responsive_image)
+        atexit.register(self.shutdown)
+
+    def submit(self, subfolder, filename):
+        """Queue derivative generation for an upload that is already on disk."""
+        path = os.path.join(self.app.config['UPLOAD_FOLDER'], subfolder, filename)
+        key = (subfolder, filename)
+
+        args = (path, self.thumbnail_size, self.widths, self.formats, self.quality)
+
+        if not self.enabled:
+            try:
+                make_derivatives(*args)
+                self._set_status(key, self.DONE)
+            except Exception as e:
+                self.app.logger.error(f"Error creating image derivatives: {e}")
+                self._set_status(key, self.FAILED)
+            return
+
+        self._set_status(key, self.PENDING)
+        future = self._get_executor().submit(make_derivatives, *args)
+        future.add_done_callback(lambda f: self._finished(key, f))
+
+    def status(self, subfolder, filename):
+        with self._lock:
+            status = self._status.get((subfolder, filename))
+        if status is not None:
+            return status
+
+        path = os.path.join(self.app.config['UPLOAD_FOLDER'], subfolder, filename)
+        if os.path.exists(manifest_path(path)):
+            return self.DONE
+        return self.MISSING
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def _get_executor(self):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = _worker_pool(self.app.config['IMAGE_WORKERS'])
+        return self._executor
+
+    def _finished(self, key, future):
+        error = future.exception()
+        if error is not None:
+            self.app.logger.error(f"Error creating image derivatives for {key[0]}/{key[1]}: {error}")
+            self._set_status(key, self.FAILED)
+        else:
+            self._set_status(key, self.DONE)
+
+    def _set_status(self, key, status):
+        with self._lock:
+            self._status[key] = status
+            self._status.move_to_end(key)
+            while len(self._status) > self.max_entries:
+                self._status.popitem(last=False)
+
+
+def thumbnail_url(subfolder, filename):
+    """Media URL of an upload's thumbnail, or of the original until the thumbnail exists."""
+    from flask import current_app
+    from app.media import media_url
+
+    if is_image(filename):
+        path = os.path.join(current_app.config['UPLOAD_FOLDER'], subfolder, filename)
+        thumb = thumbnail_path(path)
+        if os.path.exists(thumb):
+            return media_url(subfolder, os.path.basename(thumb))
+    return media_url(subfolder, filename)
+
+
+def image_srcset(subfolder, filename, format='original'):
+    """``srcset`` value for one format of an upload's derivative ladder, or '' if it has none."""
+    from flask import current_app
+    from app.media import media_url
+
+    if not filename or not is_image(filename):
+        return ''
+    manifest = load_manifest(os.path.join(current_app.config['UPLOAD_FOLDER'], subfolder, filename))
+    if manifest is None:
+        return ''
+    if format == 'original':
+        mimetype = mimetypes.guess_type(filename)[0]
+    else:
+        mimetype = mimetypes.guess_type(f'x.{format}')[0]
+    return ', '.join(f"{media_url(subfolder, d['file'])} {d['width']}w"
+                     for d in manifest['derivatives'] if d['type'] == mimetype)
+
+
+def responsive_image(subfolder, filename, sizes='100vw', **attrs):
+    """An ``<img>`` for an upload that lets the browser pick a rung of the ladder.
+
+    With a manifest this is a ``<picture>`` with one ``<source>`` per extra
+    format (WebP) and an ``<img srcset>`` over the upload's own format;
+    without one (derivatives still pending, or not an image) it is the plain
+    thumbnail ``<img>``. ``sizes`` should describe the rendered width.
+    """
+    from flask import current_app
+    from app.media import media_url
+
+    attributes = ''.join(f' {name.rstrip("_")}="{escape(value)}"' for name, value in attrs.items()
+                         if value is not None)
+    fallback = escape(thumbnail_url(subfolder, filename))
+    srcset = image_srcset(subfolder, filename)
+    if not srcset:
+        return Markup(f'<img src="{fallback}"{attributes}>')
+
+    sources = []
+    for fmt in current_app.config['IMAGE_DERIVATIVE_FORMATS']:
+        if fmt == 'original':
+            continue
+        fmt_srcset = image_srcset(subfolder, filename, fmt)
+        if fmt_srcset:
+            sources.append(f'<source type="{mimetypes.guess_type(f"x.{fmt}")[0]}" '
+                           f'srcset="{escape(fmt_srcset)}" sizes="{escape(sizes)}">')
+    src = escape(media_url(subfolder, filename))
+    return Markup(f'<picture>{"".join(sources)}<img src="{src}" srcset="{escape(srcset)}" '
+                  f'sizes="{escape(sizes)}"{attributes}></picture>')
+
+
+def reprocess_uploads(upload_folder, subfolders, size=(300, 300), widths=(), formats=('original',),
+                      quality=82, force=False, workers=None):
+    """Regenerate thumbnails and derivative ladders for existing uploads across all cores.
+
+    Returns (processed, failed) counts. Originals that already have a
+    manifest are skipped unless ``force`` is set.
+    """
+    paths = []
+    for subfolder in subfolders:
+        folder = os.path.join(upload_folder, subfolder)
+        if not os.path.isdir(folder):
+            continue
+        for name in sorted(os.listdir(folder)):
+            path = os.path.join(folder, name)
+            if not is_image(name) or _DERIVATIVE.search(os.path.splitext(name)[0]):
+                continue
+            if not force and os.path.exists(manifest_path(path)):
+                continue
+            paths.append(path)
+
+    processed = failed = 0
+    with _worker_pool(workers) as executor:
+        futures = [executor.submit(make_derivatives, path, size, widths, formats, quality)
+                   for path in paths]
+        for future in futures:
+            if future.exception() is None:
+                processed += 1
+            else:
+                failed += 1
+    return processed, failed
@@ -1,9 +1,16 @@
-from flask import render_template, request
+from flask import render_template, request, jsonify, url_for, redirect
 from app.main import main_bp
-from app.models import User, Project, BlogPost
+from app.models import User, Project, BlogPost, Skill, Technology, project_technologies
+from app.extensions import db
+from app.pagination import paginate_query
+from app import search as search_index
+from app.technologies import canonical_name
+from app.media import send_media, send_resized
+from app.routing import replica_reads
 
 @main_bp.route('/')
 @main_bp.route('/index')
+@replica_reads
 def index():
     featured_projects = Project.query.filter_by(is_featured=True, is_public=True)\
         .order_by(Project.created_at.desc()).limit(6).all()
@@ -18,21 +25,84 @@ def index():
                          featured_users=featured_users)
 
 @main_bp.route('/explore')
+@replica_reads
 def explore():
-    page = request.args.get('page', 1, type=int)
     per_page = 12
     
-    projects = Project.query.filter_by(is_public=True)\
-        .order_by(Project.created_at.desc())\
-        .paginate(page=page, per_page=per_page, error_out=False)
+    # Project.user is a plain many-to-one, so owners can be joined in.
+    # Cursor-paginated on (created_at, id); ?page= still gives numbered pages
+    projects = paginate_query(
+        Project.query.filter_by(is_public=True)
+            .options(db.joinedload(Project.user), db.selectinload(Project.technologies)),
+        Project, per_page
+    )
     
-    # Remove joinedload - dynamic relationships don't support it
+    # User.skills is dynamic and can't be eager-loaded; batch the card previews instead
     users = User.query.filter(User.projects.any())\
         .order_by(User.created_at.desc()).limit(20).all()
+    skill_previews = Skill.previews_for([user.id for user in users])
     
     return render_template('explore.html', 
                          projects=projects,
-                         users=users)
+                         users=users,
+                         skill_previews=skill_previews)
+
+@main_bp.route('/tech')
+def technologies():
+    # project_count is maintained on write, so this is a plain indexed read
+    technologies = Technology.query.filter(Technology.project_count > 0)\
+        .order_by(Technology.project_count.desc()).limit(100).all()
+    return render_template('technologies.html', technologies=technologies)
+
+@main_bp.route('/tech/<path:name>')
+def technology(name):
+    key = canonical_name(name)
+    if key != name:
+        return redirect(url_for('main.technology', name=key), code=301)
+    
+    technology = Technology.query.filter_by(name=key).first_or_404()
+    projects = paginate_query(
+        Project.query.join(project_technologies)
+            .filter(project_technologies.c.technology_id == technology.id,
+                    Project.is_public == True)
+            .options(db.joinedload(Project.user), db.selectinload(Project.technologies)),
+        Project, 12
+    )
+    
+    return render_template('technology.html', technology=technology, projects=projects)
+
+@main_bp.route('/search')
+def search():
+    query = request.args.get('q', '').strip()
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = 20
+    
+    results = search_index.search(db.session.connection(), query,
+                                  limit=per_page + 1, offset=(page - 1) * per_page)
+    
+    return render_template('search.html',
+                         query=query,
+                         results=results[:per_page],
+                         page=page,
+                         has_next=len(results) > per_page)
+
+@main_bp.route('/api/search')
+def api_search():
+    query = request.args.get('q', '').strip()
+    entity_type = request.args.get('type')
+    if entity_type not in (None, 'project', 'blog'):
+        return jsonify({'error': 'type must be project or blog'}), 400
+    limit = max(1, min(request.args.get('limit', 20, type=int), 100))
+    offset = max(request.args.get('offset', 0, type=int), 0)
+    
+    results = search_index.search(db.session.connection(), query, limit=limit,
+                                  offset=offset, entity_type=entity_type)
+    for result in results:
+        result['snippet'] = str(result['snippet'])
+        endpoint = 'portfolio.project_detail' if result['type'] == 'project' else 'portfolio.blog_detail'
+        result['url'] = url_for(endpoint, username=result['username'], slug=result['slug'])
+    
+    return jsonify({'query': query, 'results': results})
 
 @main_bp.route('/features')
 def features():
@@ -40,4 +110,12 @@ def features():
 
 @main_bp.route('/about')
 def about():
-    return render_template('about.html')
\ No newline at end of file
+    return render_template('about.html')
+
+@main_bp.route('/media/<subfolder>/<path:filename>')
+def media(subfolder, filename):
+    return send_media(subfolder, filename)
+
+@main_bp.route('/img/<int:width>x<int:height>/<subfolder>/<path:filename>')
+def resized_image(width, height, subfolder, filename):
+    return send_resized(width, height, subfolder, filename)
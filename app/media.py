@@ -0,0 +1,132 @@
+"""Serving uploaded files.
+
+Uploads are served from ``/media/<subfolder>/<filename>``. UPLOAD_FOLDER
+lives outside ``app/static`` (``instance/uploads`` by default), so the
+static route can't bypass the app, which decides what may be served and
+how:
+
+* ``MEDIA_SERVE_MODE = 'python'`` streams the file from the worker with
+  conditional and byte-range support (``206 Partial Content``), which is
+  what video seeking needs.
+* ``'x-accel'`` answers with an empty body and ``X-Accel-Redirect`` under
+  ``MEDIA_ACCEL_PREFIX``; nginx maps that prefix to the upload folder in an
+  ``internal`` location and does the transfer, ranges included.
+* ``'x-sendfile'`` does the same for Apache/lighttpd with ``X-Sendfile``
+  and the absolute path.
+
+Stored names are content hashes or random UUIDs and are never rewritten,
+so those responses are marked immutable. Only such names and their
+``_thumb``/``_w<width>`` derivatives are served; staging files and srcset
+manifests in the same folder are not. The default profile picture ships
+in ``app/static/img`` and ``media_url`` points there.
+
+Uploads from before UPLOAD_FOLDER left ``app/static`` are moved across
+with ``flask move-uploads``.
+
+``/img/<w>x<h>/<subfolder>/<filename>`` serves resized copies of image
+uploads from the ``ImageResizer`` disk cache.
+"""
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+from flask import abort, current_app, make_response, send_file, url_for
+from werkzeug.security import safe_join
+
+MEDIA_SUBFOLDERS = ('profiles', 'projects', 'achievements')
+SERVE_MODES = ('python', 'x-accel', 'x-sendfile')
+
+IMMUTABLE_MAX_AGE = 31536000
+
+DEFAULT_PROFILE_PIC = 'default-profile.jpg'
+
+# <sha256>.<ext> or <uuid4 hex>.<ext>, optionally a derivative of one
+_FINGERPRINTED = re.compile(r'^(?:[0-9a-f]{64}|[0-9a-f]{32})(?:_thumb|_w\d+)?\.([a-z0-9]+)$')
+
+
+def init_media(app):
+    app.config.setdefault('MEDIA_SERVE_MODE', 'python')
+    app.config.setdefault('MEDIA_ACCEL_PREFIX', '/protected-uploads/')
+    app.config.setdefault('MEDIA_MAX_AGE', 3600)
+
+    if app.config['MEDIA_SERVE_MODE'] not in SERVE_MODES:
+        raise ValueError(f"MEDIA_SERVE_MODE must be one of {', '.join(SERVE_MODES)}")
+    app.add_template_global(media_url)
+
+
+def is_fingerprinted(filename):
+    return bool(_FINGERPRINTED.match(filename))
+
+
+def media_url(subfolder, filename):
+    if filename == DEFAULT_PROFILE_PIC:
+        return url_for('static', filename=f'img/{DEFAULT_PROFILE_PIC}')
+    return url_for('main.media', subfolder=subfolder, filename=filename)
+
+
+def media_path(subfolder, filename):
+    """Absolute path of an upload, or None if it is not one that may be served."""
+    if subfolder not in MEDIA_SUBFOLDERS:
+        return None
+    match = _FINGERPRINTED.match(filename)
+    config = current_app.config
+    if match is None or match.group(1) not in (set(config['ALLOWED_EXTENSIONS'])
+                                               | set(config['IMAGE_DERIVATIVE_FORMATS'])):
+        return None
+    path = safe_join(os.path.abspath(config['UPLOAD_FOLDER']), subfolder, filename)
+    if path is None or not os.path.isfile(path):
+        return None
+    return path
+
+
+def send_media(subfolder, filename):
+    path = media_path(subfolder, filename)
+    if path is None:
+        abort(404)
+
+    config = current_app.config
+    immutable = is_fingerprinted(os.path.basename(path))
+    max_age = IMMUTABLE_MAX_AGE if immutable else config['MEDIA_MAX_AGE']
+    mode = config['MEDIA_SERVE_MODE']
+
+    if mode == 'python':
+        response = send_file(path, conditional=True, max_age=max_age)
+    else:
+        response = make_response('')
+        response.mimetype = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        if mode == 'x-accel':
+            prefix = config['MEDIA_ACCEL_PREFIX'].rstrip('/')
+            # nginx decodes the URI before mapping it to a file
+            response.headers['X-Accel-Redirect'] = f"{prefix}/{quote(subfolder)}/{quote(filename)}"
+        else:
+            response.headers['X-Sendfile'] = path
+
+    return _cache_headers(response, immutable, max_age)
+
+
+def send_resized(width, height, subfolder, filename):
+    """A whitelisted resize of an image upload, made on first request.
+
+    Variants are small and live outside the upload folder, so they are
+    always streamed from the worker whatever MEDIA_SERVE_MODE says.
+    """
+    from app.extensions import image_resizer
+    from app.images import is_image
+
+    path = media_path(subfolder, filename)
+    if path is None or not is_image(filename) or not image_resizer.allowed(width, height):
+        abort(404)
+
+    variant = image_resizer.variant(width, height, subfolder, filename, path)
+    immutable = is_fingerprinted(os.path.basename(path))
+    max_age = IMMUTABLE_MAX_AGE if immutable else current_app.config['MEDIA_MAX_AGE']
+    return _cache_headers(send_file(variant, conditional=True, max_age=max_age), immutable, max_age)
+
+
+def _cache_headers(response, immutable, max_age):
+    response.cache_control.public = True
+    response.cache_control.max_age = max_age
+    if immutable:
+        response.cache_control.immutable = True
+    response.headers['X-Content-Type-Options'] = 'nosniff'
+    return response
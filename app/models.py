@@ -1,8 +1,6 @@
-from datetime import datetime
+from datetime import datetime, date
 from app.extensions import db, login_manager
 from flask_login import UserMixin
-from werkzeug.security import generate_password_hash, check_password_hash
-import bleach
 
 class User(UserMixin, db.Model):
     __tablename__ = 'users'
@@ -25,6 +23,8 @@ class User(UserMixin, db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    __table_args__ = (db.Index('ix_users_created_at', 'created_at'),)
+    
     # Relationships
     skills = db.relationship('Skill', backref='user', lazy='dynamic', cascade='all, delete-orphan')
     projects = db.relationship('Project', backref='user', lazy='dynamic', cascade='all, delete-orphan')
@@ -38,10 +38,17 @@ class User(UserMixin, db.Model):
     
     @password.setter
     def password(self, password):
-        self.password_hash = generate_password_hash(password)
+        from app.extensions import password_hasher
+        self.password_hash = password_hasher.hash(password)
     
     def verify_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        from app.extensions import password_hasher
+        return password_hasher.verify(self.password_hash, password)
+    
+    @property
+    def password_needs_rehash(self):
+        from app.extensions import password_hasher
+        return password_hasher.needs_rehash(self.password_hash)
     
     def to_dict(self):
         return {
@@ -64,7 +71,52 @@ class Skill(db.Model):
     proficiency = db.Column(db.Integer, default=1)  # 1-5 scale
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
-    __table_args__ = (db.UniqueConstraint('user_id', 'name', name='_user_skill_uc'),)
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'name', name='_user_skill_uc'),
+        db.Index('ix_skills_user_created', 'user_id', 'created_at'),
+    )
+    
+    @classmethod
+    def previews_for(cls, user_ids, limit=3):
+        """Map each user id to (first ``limit`` skills, total skill count) in one query."""
+        if not user_ids:
+            return {}
+        
+        ranked = db.select(
+            cls,
+            db.func.row_number().over(partition_by=cls.user_id, order_by=cls.id).label('rank'),
+            db.func.count().over(partition_by=cls.user_id).label('total')
+        ).where(cls.user_id.in_(user_ids)).subquery()
+        skill = db.aliased(cls, ranked)
+        
+        rows = db.session.execute(
+            db.select(skill, ranked.c.total)
+            .where(ranked.c.rank <= limit)
+            .order_by(ranked.c.user_id, ranked.c.rank)
+        ).all()
+        
+        previews = {}
+        for skill_row, total in rows:
+            previews.setdefault(skill_row.user_id, ([], total))[0].append(skill_row)
+        return previews
+
+project_technologies = db.Table('project_technologies',
+    db.Column('project_id', db.Integer, db.ForeignKey('projects.id', ondelete='CASCADE'), primary_key=True),
+    db.Column('technology_id', db.Integer, db.ForeignKey('technologies.id', ondelete='CASCADE'), primary_key=True),
+    db.Column('position', db.Integer, nullable=False, default=0, server_default='0'),  # Order in tech_stack
+    db.Index('ix_project_technologies_technology', 'technology_id', 'project_id')
+)
+
+class Technology(db.Model):
+    __tablename__ = 'technologies'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(64), unique=True, index=True, nullable=False)  # Case-folded canonical name
+    display_name = db.Column(db.String(64), nullable=False)
+    project_count = db.Column(db.Integer, nullable=False, default=0)  # Public projects, kept by app.technologies
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (db.Index('ix_technologies_project_count', 'project_count'),)
 
 class Project(db.Model):
     __tablename__ = 'projects'
@@ -76,6 +128,12 @@ class Project(db.Model):
     description = db.Column(db.Text, nullable=False)
     short_description = db.Column(db.String(300))
     tech_stack = db.Column(db.Text)  # Comma-separated technologies
+    # Derived from description by app.rendering when the row is written
+    description_html = db.Column(db.Text)
+    summary = db.Column(db.String(300))
+    word_count = db.Column(db.Integer)
+    reading_time = db.Column(db.Integer)  # Minutes
+    render_version = db.Column(db.Integer)
     repo_url = db.Column(db.String(255))
     live_url = db.Column(db.String(255))
     featured_image = db.Column(db.String(255))
@@ -86,19 +144,36 @@ class Project(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    technologies = db.relationship('Technology', secondary=project_technologies,
+                                   order_by=project_technologies.c.position,
+                                   backref=db.backref('projects', lazy='dynamic'))
+    
+    __table_args__ = (
+        db.Index('ix_projects_user_created', 'user_id', 'created_at'),
+        db.Index('ix_projects_public_created', 'is_public', 'created_at'),
+        db.Index('ix_projects_featured_public_created', 'is_featured', 'is_public', 'created_at'),
+        db.Index('ix_projects_created_at', 'created_at'),
+        db.Index('ix_projects_views', 'views'),
+    )
+    
     @property
     def tech_list(self):
-        if self.tech_stack:
-            return [tech.strip() for tech in self.tech_stack.split(',')]
-        return []
+        return [tech.display_name for tech in self.technologies]
+    
+    def sync_technologies(self):
+        """Point ``technologies`` at the rows named by ``tech_stack``, creating missing ones."""
+        from app.technologies import technologies_for, keep_order
+        self.technologies = technologies_for(self.tech_stack)
+        keep_order(self)
     
     def increment_views(self):
-        self.views += 1
-        db.session.commit()
+        from app.extensions import view_counter_buffer
+        view_counter_buffer.increment(Project, self.id)
     
-    def clean_description(self):
-        allowed_tags = ['p', 'br', 'b', 'i', 'strong', 'em', 'ul', 'ol', 'li', 'code', 'pre']
-        self.description = bleach.clean(self.description, tags=allowed_tags, strip=True)
+    def render(self):
+        """Refresh description_html, summary and counts now rather than at flush."""
+        from app.rendering import render
+        render(self)
 
 class Achievement(db.Model):
     __tablename__ = 'achievements'
@@ -112,6 +187,8 @@ class Achievement(db.Model):
     issuer = db.Column(db.String(100))
     issue_date = db.Column(db.Date)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (db.Index('ix_achievements_user_created', 'user_id', 'created_at'),)
 
 class BlogPost(db.Model):
     __tablename__ = 'blog_posts'
@@ -122,19 +199,31 @@ class BlogPost(db.Model):
     slug = db.Column(db.String(200), unique=True, index=True)
     content = db.Column(db.Text, nullable=False)
     excerpt = db.Column(db.String(300))
+    # Derived from content by app.rendering when the row is written
+    content_html = db.Column(db.Text)
+    summary = db.Column(db.String(300))
+    word_count = db.Column(db.Integer)
+    reading_time = db.Column(db.Integer)  # Minutes
+    render_version = db.Column(db.Integer)
     featured_image = db.Column(db.String(255))
     is_published = db.Column(db.Boolean, default=True)
     views = db.Column(db.Integer, default=0)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
-    def clean_content(self):
-        allowed_tags = ['p', 'br', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 
-                       'b', 'i', 'strong', 'em', 'ul', 'ol', 'li', 
-                       'code', 'pre', 'blockquote', 'a', 'img']
-        allowed_attrs = {'a': ['href', 'title'], 'img': ['src', 'alt', 'title']}
-        self.content = bleach.clean(self.content, tags=allowed_tags, 
-                                   attributes=allowed_attrs, strip=True)
+    __table_args__ = (
+        db.Index('ix_blog_posts_user_created', 'user_id', 'created_at'),
+        db.Index('ix_blog_posts_published_created', 'is_published', 'created_at'),
+    )
+    
+    def render(self):
+        """Refresh content_html, summary and counts now rather than at flush."""
+        from app.rendering import render
+        render(self)
+    
+    def increment_views(self):
+        from app.extensions import view_counter_buffer
+        view_counter_buffer.increment(BlogPost, self.id)
 
 class ViewLog(db.Model):
     __tablename__ = 'view_logs'
@@ -147,7 +236,245 @@ class ViewLog(db.Model):
     referrer = db.Column(db.String(255))
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
+    
+    __table_args__ = (db.Index('ix_view_logs_user_timestamp', 'user_id', 'timestamp'),)
+
+class ViewDailyRollup(db.Model):
+    __tablename__ = 'view_daily_rollup'
+    
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    entity_type = db.Column(db.String(20), primary_key=True)
+    entity_id = db.Column(db.Integer, primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+    
+    __table_args__ = (db.Index('ix_view_daily_rollup_user_day', 'user_id', 'day'),)
+    
+    @classmethod
+    def add_views(cls, connection, rows):
+        """Fold ViewLog rows (dicts of column values) into the daily buckets.
+        
+        Runs on the caller's connection so the rollup commits or rolls back
+        together with the raw log rows. Views without a user_id are not
+        attributable to any dashboard and are skipped.
+        """
+        buckets = {}
+        for row in rows:
+            if row.get('user_id') is None:
+                continue
+            key = (row['user_id'], row['entity_type'], row['entity_id'],
+                   (row.get('timestamp') or datetime.utcnow()).date())
+            buckets[key] = buckets.get(key, 0) + 1
+        if not buckets:
+            return
+        
+        values = [{'user_id': k[0], 'entity_type': k[1], 'entity_id': k[2],
+                   'day': k[3], 'count': n} for k, n in buckets.items()]
+        table = cls.__table__
+        
+        if connection.dialect.name in ('sqlite', 'postgresql'):
+            if connection.dialect.name == 'sqlite':
+                from sqlalchemy.dialects.sqlite import insert
+            else:
+                from sqlalchemy.dialects.postgresql import insert
+            stmt = insert(table).values(values)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[table.c.user_id, table.c.entity_type,
+                                table.c.entity_id, table.c.day],
+                set_={'count': table.c.count + stmt.excluded.count}
+            )
+            connection.execute(stmt)
+            return
+        
+        for value in values:
+            result = connection.execute(
+                table.update().where(
+                    table.c.user_id == value['user_id'],
+                    table.c.entity_type == value['entity_type'],
+                    table.c.entity_id == value['entity_id'],
+                    table.c.day == value['day']
+                ).values(count=table.c.count + value['count'])
+            )
+            if result.rowcount == 0:
+                connection.execute(table.insert().values(value))
+
+class SiteCounter(db.Model):
+    """New-entity counts per day, plus a running total under ``TOTAL_DAY``.
+    
+    Kept in step with inserts and deletes by app.counters, so dashboard
+    totals are single primary-key reads instead of COUNT(*) over big tables.
+    """
+    __tablename__ = 'site_counters'
+    
+    TOTAL_DAY = date.min
+    
+    name = db.Column(db.String(32), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+    
+    @classmethod
+    def add(cls, connection, deltas):
+        """Apply {(name, day): delta} to the day buckets and the totals."""
+        merged = {}
+        for (name, day), delta in deltas.items():
+            for key in ((name, day), (name, cls.TOTAL_DAY)):
+                merged[key] = merged.get(key, 0) + delta
+        values = [{'name': k[0], 'day': k[1], 'count': n} for k, n in merged.items() if n]
+        if not values:
+            return
+        table = cls.__table__
+        
+        if connection.dialect.name in ('sqlite', 'postgresql'):
+            if connection.dialect.name == 'sqlite':
+                from sqlalchemy.dialects.sqlite import insert
+            else:
+                from sqlalchemy.dialects.postgresql import insert
+            stmt = insert(table).values(values)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[table.c.name, table.c.day],
+                set_={'count': table.c.count + stmt.excluded.count}
+            )
+            connection.execute(stmt)
+            return
+        
+        for value in values:
+            result = connection.execute(
+                table.update().where(table.c.name == value['name'], table.c.day == value['day'])
+                .values(count=table.c.count + value['count'])
+            )
+            if result.rowcount == 0:
+                connection.execute(table.insert().values(value))
+    
+    @classmethod
+    def totals(cls, names):
+        rows = db.session.execute(
+            db.select(cls.name, cls.count).where(cls.name.in_(names), cls.day == cls.TOTAL_DAY)
+        ).all()
+        return {name: count for name, count in rows}
+    
+    @classmethod
+    def since(cls, names, day):
+        """New entities per counter from ``day`` (inclusive) onwards."""
+        rows = db.session.execute(
+            db.select(cls.name, db.func.sum(cls.count))
+            .where(cls.name.in_(names), cls.day >= day).group_by(cls.name)
+        ).all()
+        return {name: count for name, count in rows}
+
+class UploadRef(db.Model):
+    __tablename__ = 'upload_refs'
+    
+    subfolder = db.Column(db.String(50), primary_key=True)
+    filename = db.Column(db.String(255), primary_key=True)
+    ref_count = db.Column(db.Integer, nullable=False, default=0)
+    size = db.Column(db.Integer)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    @classmethod
+    def acquire(cls, session, subfolder, filename, size=None):
+        """Take a reference to a stored upload, creating its row on first use.
+        
+        The write locks the row until the transaction ends; see app.storage.
+        """
+        table = cls.__table__
+        dialect = session.get_bind().dialect.name
+        
+        if dialect in ('sqlite', 'postgresql'):
+            if dialect == 'sqlite':
+                from sqlalchemy.dialects.sqlite import insert
+            else:
+                from sqlalchemy.dialects.postgresql import insert
+            stmt = insert(table).values(subfolder=subfolder, filename=filename, ref_count=1,
+                                        size=size, created_at=datetime.utcnow())
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[table.c.subfolder, table.c.filename],
+                set_={'ref_count': table.c.ref_count + 1}
+            )
+            session.execute(stmt)
+            return
+        
+        result = session.execute(
+            table.update().where(table.c.subfolder == subfolder, table.c.filename == filename)
+            .values(ref_count=table.c.ref_count + 1)
+        )
+        if result.rowcount == 0:
+            session.execute(table.insert().values(subfolder=subfolder, filename=filename,
+                                                  ref_count=1, size=size,
+                                                  created_at=datetime.utcnow()))
+    
+    @classmethod
+    def hold(cls, session, subfolder, filename, size=None):
+        """Record an upload nothing references yet, restarting its expiry if it is unreferenced."""
+        table = cls.__table__
+        where = (table.c.subfolder == subfolder, table.c.filename == filename)
+        now = datetime.utcnow()
+        dialect = session.get_bind().dialect.name
+        
+        if dialect in ('sqlite', 'postgresql'):
+            if dialect == 'sqlite':
+                from sqlalchemy.dialects.sqlite import insert
+            else:
+                from sqlalchemy.dialects.postgresql import insert
+            stmt = insert(table).values(subfolder=subfolder, filename=filename, ref_count=0,
+                                        size=size, created_at=now)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[table.c.subfolder, table.c.filename],
+                set_={'created_at': now},
+                where=table.c.ref_count <= 0
+            )
+            session.execute(stmt)
+            return
+        
+        result = session.execute(
+            table.update().where(*where, table.c.ref_count <= 0).values(created_at=now)
+        )
+        if result.rowcount:
+            return
+        if session.execute(db.select(table.c.ref_count).where(*where)).first() is None:
+            session.execute(table.insert().values(subfolder=subfolder, filename=filename,
+                                                  ref_count=0, size=size, created_at=now))
+    
+    @classmethod
+    def release(cls, session, subfolder, filename):
+        """Drop a reference; returns the remaining count, or None if the upload is untracked.
+        
+        A row that drops to zero stays behind as a tombstone until
+        ``remove_unreferenced`` deletes it together with the bytes.
+        """
+        table = cls.__table__
+        where = (table.c.subfolder == subfolder, table.c.filename == filename)
+        
+        result = session.execute(table.update().where(*where).values(ref_count=table.c.ref_count - 1))
+        if result.rowcount == 0:
+            return None
+        
+        return max(session.execute(db.select(table.c.ref_count).where(*where)).scalar(), 0)
+    
+    @classmethod
+    def unreferenced_before(cls, session, cutoff):
+        """(subfolder, filename) of rows unreferenced since before ``cutoff``."""
+        table = cls.__table__
+        return session.execute(
+            db.select(table.c.subfolder, table.c.filename)
+            .where(table.c.ref_count <= 0, table.c.created_at < cutoff)
+        ).all()
+    
+    @classmethod
+    def remove_unreferenced(cls, connection, subfolder, filename, before=None):
+        """Delete the row if it is still unreferenced (and older than ``before``); True if it was.
+        
+        The delete waits for any transaction that has taken a new reference
+        and then skips the row, and it holds the row lock until
+        ``connection``'s transaction ends.
+        """
+        table = cls.__table__
+        criteria = [table.c.subfolder == subfolder, table.c.filename == filename, table.c.ref_count <= 0]
+        if before is not None:
+            criteria.append(table.c.created_at < before)
+        result = connection.execute(table.delete().where(*criteria))
+        return result.rowcount > 0
 
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
\ No newline at end of file
+    from app.extensions import user_cache
+    return user_cache.load(int(user_id))
\ No newline at end of file
@@ -0,0 +1,118 @@
+import base64
+import json
+from datetime import datetime
+from flask import request
+from sqlalchemy import Select, tuple_
+from app.extensions import db
+
+
+class KeysetPage:
+    """One page of a (created_at, id) descending keyset walk.
+
+    Mirrors the parts of Flask-SQLAlchemy's Pagination that templates use
+    (``items``, ``has_next``, ``has_prev``) and adds opaque cursors for the
+    neighbouring pages. There is no total count by design.
+    """
+
+    def __init__(self, items, per_page, next_cursor=None, prev_cursor=None):
+        self.items = items
+        self.per_page = per_page
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_prev(self):
+        return self.prev_cursor is not None
+
+    def __iter__(self):
+        return iter(self.items)
+
+
+def per_page_arg(default=20, maximum=100):
+    """``?per_page=`` clamped to 1..maximum."""
+    return max(1, min(request.args.get('per_page', default, type=int), maximum))
+
+
+def encode_cursor(created_at, id, direction):
+    # A cursor without a timestamp would decode as "no cursor" and restart at page 1
+    if created_at is None:
+        raise ValueError("Cannot build a cursor for a row without created_at")
+    payload = json.dumps([created_at.isoformat(), id, direction], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Return (created_at, id, direction) or None for a missing or malformed token."""
+    if not token:
+        return None
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        created_at, id, direction = json.loads(base64.urlsafe_b64decode(padded))
+        if direction not in ('next', 'prev'):
+            return None
+        return datetime.fromisoformat(created_at), int(id), direction
+    except (ValueError, TypeError):
+        return None
+
+
+def keyset_window(query, model, cursor, per_page):
+    """Restrict a Query or Select to the page after/before ``cursor``.
+
+    Fetches one row more than ``per_page`` so the caller can tell whether
+    another page follows. Returns (query, backwards); rows of a backwards
+    window come out in ascending order and must be reversed. Rows without a
+    ``created_at`` have no place in the walk and are left out.
+    """
+    key = tuple_(model.created_at, model.id)
+    decoded = decode_cursor(cursor)
+    query = query.where(model.created_at.isnot(None))
+
+    if decoded is None:
+        return query.order_by(model.created_at.desc(), model.id.desc()).limit(per_page + 1), False
+
+    created_at, id, direction = decoded
+    if direction == 'next':
+        return query.where(key < tuple_(created_at, id))\
+            .order_by(model.created_at.desc(), model.id.desc())\
+            .limit(per_page + 1), False
+    return query.where(key > tuple_(created_at, id))\
+        .order_by(model.created_at.asc(), model.id.asc())\
+        .limit(per_page + 1), True
+
+
+def keyset_paginate(query, model, cursor=None, per_page=20):
+    window, backwards = keyset_window(query, model, cursor, per_page)
+    # Accepts ORM queries and plain column SELECTs alike
+    rows = db.session.execute(window).all() if isinstance(window, Select) else window.all()
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+
+    if backwards:
+        rows.reverse()
+        has_next, has_prev = True, has_more
+    else:
+        has_next, has_prev = has_more, decode_cursor(cursor) is not None
+
+    next_cursor = encode_cursor(rows[-1].created_at, rows[-1].id, 'next') \
+        if rows and has_next else None
+    prev_cursor = encode_cursor(rows[0].created_at, rows[0].id, 'prev') \
+        if rows and has_prev else None
+    return KeysetPage(rows, per_page, next_cursor, prev_cursor)
+
+
+def paginate_query(query, model, per_page=20):
+    """Keyset-paginate newest first, or use OFFSET paging when ``?page=`` is given.
+
+    Offset pages carry a total count (``pages``, ``total``) for views that
+    really need one, at the price of a COUNT(*) and a growing OFFSET.
+    """
+    per_page = max(1, per_page)
+    if 'page' in request.args:
+        page = request.args.get('page', 1, type=int)
+        return query.order_by(model.created_at.desc(), model.id.desc())\
+            .paginate(page=page, per_page=per_page, error_out=False)
+    return keyset_paginate(query, model, request.args.get('cursor'), per_page)
@@ -0,0 +1,145 @@
+import atexit
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from werkzeug.security import generate_password_hash, check_password_hash
+
+
+class HasherBusy(Exception):
+    """Raised when too many hash jobs are already queued or running."""
+
+
+class PasswordHasher:
+    """Runs password hashing and verification in a small bounded thread pool.
+
+    hashlib's scrypt and PBKDF2 release the GIL, so a few dedicated threads
+    keep a burst of logins from occupying every request worker. At most
+    PASSWORD_HASH_MAX_PENDING jobs may be queued or running; callers beyond
+    that get ``HasherBusy`` straight away rather than waiting in line, as do
+    callers whose job hasn't finished within PASSWORD_HASH_TIMEOUT seconds.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self.method = None
+        self.salt_length = 16
+        self._executor = None
+        self._slots = None
+        self._lock = threading.Lock()
+        self._reset_stats()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')
+        app.config.setdefault('PASSWORD_SALT_LENGTH', 16)
+        app.config.setdefault('PASSWORD_HASH_WORKERS', 2)
+        app.config.setdefault('PASSWORD_HASH_MAX_PENDING', 32)
+        app.config.setdefault('PASSWORD_HASH_TIMEOUT', 10)
+
+        self.app = app
+        self.salt_length = app.config['PASSWORD_SALT_LENGTH']
+        # Expand shorthands like 'pbkdf2' to the full 'pbkdf2:sha256:<n>' prefix
+        # werkzeug stores, so needs_rehash() can compare prefixes directly
+        self.method = generate_password_hash('', app.config['PASSWORD_HASH_METHOD'],
+                                             self.salt_length).split('$', 1)[0]
+        self.timeout = app.config['PASSWORD_HASH_TIMEOUT']
+
+        self.shutdown()
+        self._slots = threading.BoundedSemaphore(app.config['PASSWORD_HASH_MAX_PENDING'])
+        self._reset_stats()
+
+        app.extensions['password_hasher'] = self
+        atexit.register(self.shutdown)
+
+    def hash(self, password):
+        if self.app is None:
+            return generate_password_hash(password)
+        return self._run(generate_password_hash, password, self.method, self.salt_length)
+
+    def verify(self, pwhash, password):
+        if self.app is None:
+            return check_password_hash(pwhash, password)
+        return self._run(check_password_hash, pwhash, password)
+
+    def needs_rehash(self, pwhash):
+        """True if ``pwhash`` was made with other parameters than the configured ones."""
+        if self.method is None or not pwhash or pwhash.count('$') < 2:
+            return False
+        method, salt, _ = pwhash.split('$', 2)
+        return method != self.method or len(salt) != self.salt_length
+
+    def stats(self):
+        with self._lock:
+            completed = self.completed
+            return {
+                'submitted': self.submitted,
+                'completed': completed,
+                'rejected': self.rejected,
+                'in_flight': self.submitted - completed,
+                'avg_queue_ms': round(self.queue_time / completed * 1000, 2) if completed else 0.0,
+                'max_queue_ms': round(self.max_queue_time * 1000, 2),
+                'avg_run_ms': round(self.run_time / completed * 1000, 2) if completed else 0.0,
+            }
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def _run(self, func, *args):
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise HasherBusy('Too many password hashing requests in flight')
+
+        queued_at = time.monotonic()
+        with self._lock:
+            self.submitted += 1
+        try:
+            future = self._get_executor().submit(self._timed, func, args, queued_at)
+        except Exception:
+            self._slots.release()
+            raise
+        # The slot is held until the job ends, even if this caller times out
+        future.add_done_callback(lambda f: self._slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            # A job still waiting in the queue is dropped; a running one finishes unobserved
+            cancelled = future.cancel()
+            with self._lock:
+                self.rejected += 1
+                if cancelled:
+                    self.submitted -= 1
+            raise HasherBusy('Password hashing timed out') from None
+
+    def _timed(self, func, args, queued_at):
+        started = time.monotonic()
+        try:
+            return func(*args)
+        finally:
+            finished = time.monotonic()
+            with self._lock:
+                self.completed += 1
+                self.queue_time += started - queued_at
+                self.max_queue_time = max(self.max_queue_time, started - queued_at)
+                self.run_time += finished - started
+
+    def _get_executor(self):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.app.config['PASSWORD_HASH_WORKERS'],
+                        thread_name_prefix='password-hash'
+                    )
+        return self._executor
+
+    def _reset_stats(self):
+        self.submitted = 0
+        self.completed = 0
+        self.rejected = 0
+        self.queue_time = 0.0
+        self.max_queue_time = 0.0
+        self.run_time = 0.0
@@ -1,11 +1,20 @@
-from flask import render_template, redirect, url_for, flash, request, jsonify, abort
+from flask import render_template, redirect, url_for, flash, request, jsonify, abort, Response, \
+    stream_with_context, current_app
 from flask_login import current_user, login_required
 from app.portfolio import portfolio_bp
 from app.portfolio.forms import ProfileForm, ProjectForm, BlogPostForm, AchievementForm, SkillForm
 from app.models import User, Project, BlogPost, Achievement, Skill, ViewLog
-from app.extensions import db
-from app.portfolio.utils import save_file, delete_file, log_view, get_view_stats
+from app.extensions import db, view_counter_buffer, image_pipeline
+from app.images import thumbnail_url, image_srcset
+from app.media import media_url, MEDIA_SUBFOLDERS
+from app.routing import replica_reads
+from app.pagination import keyset_window, keyset_paginate, per_page_arg
+from app.technologies import technology_names
+from app.portfolio.utils import save_file, delete_file, log_view, get_view_stats, get_top_projects, get_cached_page, cache_page, \
+    is_fresh, conditional_response, page_etag, portfolio_validator, project_validator, blog_validator, \
+    PROJECT_API_FIELDS, parse_project_fields, project_api_select, project_api_row
 import os
+import json
 from datetime import datetime
 from slugify import slugify
 
@@ -79,7 +88,8 @@ def edit_profile():
 @portfolio_bp.route('/projects')
 @login_required
 def projects():
-    user_projects = current_user.projects.order_by(Project.created_at.desc()).all()
+    user_projects = current_user.projects.order_by(Project.created_at.desc())\
+        .options(db.selectinload(Project.technologies)).all()
     return render_template('portfolio/projects.html', projects=user_projects)
 
 @portfolio_bp.route('/projects/add', methods=['GET', 'POST'])
@@ -101,8 +111,7 @@ def add_project():
             is_featured=form.is_featured.data
         )
         
-        # Clean HTML in description
-        project.clean_description()
+        project.sync_technologies()
         
         # Handle featured image upload
         if form.featured_image.data:
@@ -140,8 +149,7 @@ def edit_project(project_id):
         project.is_public = form.is_public.data
         project.is_featured = form.is_featured.data
         
-        # Clean HTML in description
-        project.clean_description()
+        project.sync_technologies()
         
         # Handle featured image upload
         if form.featured_image.data:
@@ -210,9 +218,6 @@ def add_blog():
             is_published=form.is_published.data
         )
         
-        # Clean HTML in content
-        post.clean_content()
-        
         # Handle featured image upload
         if form.featured_image.data:
             filename = save_file(form.featured_image.data, 'projects')  # Use projects folder for blog images too
@@ -245,9 +250,6 @@ def edit_blog(post_id):
         post.excerpt = form.excerpt.data
         post.is_published = form.is_published.data
         
-        # Clean HTML in content
-        post.clean_content()
-        
         # Handle featured image upload
         if form.featured_image.data:
             # Delete old image if exists
@@ -405,7 +407,7 @@ def analytics():
     stats = get_view_stats(current_user.id)
     
     # Get top viewed projects
-    top_projects = current_user.projects.order_by(Project.views.desc()).limit(5).all()
+    top_projects = get_top_projects(current_user.id)
     
     # Get recent views
     recent_views = ViewLog.query.filter(
@@ -421,7 +423,23 @@ def analytics():
 
 # Public Portfolio Routes
 @portfolio_bp.route('/<username>')
+@replica_reads
 def public_portfolio(username):
+    cache_key = ('portfolio', username)
+    cached = get_cached_page(cache_key)
+    if cached:
+        html, user_id, etag, last_modified = cached
+        log_view('profile', user_id, request)
+        return conditional_response(html, etag, last_modified)
+    
+    validator = portfolio_validator(username)
+    if validator is None:
+        abort(404)
+    user_id, etag, last_modified = validator
+    if is_fresh(etag, last_modified):
+        log_view('profile', user_id, request)
+        return conditional_response('', etag, last_modified)
+    
     user = User.query.filter_by(username=username).first_or_404()
     
     # Log this view
@@ -429,7 +447,8 @@ def public_portfolio(username):
     
     # Get user's public projects
     projects = user.projects.filter_by(is_public=True)\
-        .order_by(Project.created_at.desc()).all()
+        .order_by(Project.created_at.desc())\
+        .options(db.selectinload(Project.technologies)).all()
     
     # Get user's published blog posts
     blog_posts = user.blog_posts.filter_by(is_published=True)\
@@ -441,15 +460,36 @@ def public_portfolio(username):
     # Get user's skills
     skills = user.skills.order_by(Skill.proficiency.desc()).all()
     
-    return render_template('portfolio/public_portfolio.html',
+    html = render_template('portfolio/public_portfolio.html',
                          user=user,
                          projects=projects,
                          blog_posts=blog_posts,
                          achievements=achievements,
                          skills=skills)
+    cache_page(cache_key, html, user.id, tags=[f'user:{user.id}', f'portfolio:{user.id}'],
+               etag=etag, last_modified=last_modified)
+    return conditional_response(html, etag, last_modified)
 
 @portfolio_bp.route('/<username>/project/<slug>')
+@replica_reads
 def project_detail(username, slug):
+    cache_key = ('project', username, slug)
+    cached = get_cached_page(cache_key)
+    if cached:
+        html, project_id, etag, last_modified = cached
+        log_view('project', project_id, request)
+        view_counter_buffer.increment(Project, project_id)
+        return conditional_response(html, etag, last_modified)
+    
+    validator = project_validator(username, slug)
+    if validator is None:
+        abort(404)
+    project_id, etag, last_modified = validator
+    if is_fresh(etag, last_modified):
+        log_view('project', project_id, request)
+        view_counter_buffer.increment(Project, project_id)
+        return conditional_response('', etag, last_modified)
+    
     user = User.query.filter_by(username=username).first_or_404()
     project = Project.query.filter_by(
         user_id=user.id,
@@ -461,12 +501,33 @@ def project_detail(username, slug):
     log_view('project', project.id, request)
     project.increment_views()
     
-    return render_template('portfolio/project_detail.html',
+    html = render_template('portfolio/project_detail.html',
                          user=user,
                          project=project)
+    cache_page(cache_key, html, project.id, tags=[f'user:{user.id}', f'project:{project.id}'],
+               etag=etag, last_modified=last_modified)
+    return conditional_response(html, etag, last_modified)
 
 @portfolio_bp.route('/<username>/blog/<slug>')
+@replica_reads
 def blog_detail(username, slug):
+    cache_key = ('blog', username, slug)
+    cached = get_cached_page(cache_key)
+    if cached:
+        html, post_id, etag, last_modified = cached
+        log_view('blog', post_id, request)
+        view_counter_buffer.increment(BlogPost, post_id)
+        return conditional_response(html, etag, last_modified)
+    
+    validator = blog_validator(username, slug)
+    if validator is None:
+        abort(404)
+    post_id, etag, last_modified = validator
+    if is_fresh(etag, last_modified):
+        log_view('blog', post_id, request)
+        view_counter_buffer.increment(BlogPost, post_id)
+        return conditional_response('', etag, last_modified)
+    
     user = User.query.filter_by(username=username).first_or_404()
     post = BlogPost.query.filter_by(
         user_id=user.id,
@@ -476,12 +537,14 @@ def blog_detail(username, slug):
     
     # Log this view
     log_view('blog', post.id, request)
-    post.views += 1
-    db.session.commit()
+    post.increment_views()
     
-    return render_template('portfolio/blog_detail.html',
+    html = render_template('portfolio/blog_detail.html',
                          user=user,
                          post=post)
+    cache_page(cache_key, html, post.id, tags=[f'user:{user.id}', f'blog:{post.id}'],
+               etag=etag, last_modified=last_modified)
+    return conditional_response(html, etag, last_modified)
 
 # API Routes
 @portfolio_bp.route('/api/profile/update', methods=['POST'])
@@ -507,36 +570,92 @@ def api_update_profile():
         return jsonify({'error': str(e)}), 500
 
 @portfolio_bp.route('/api/projects', methods=['GET'])
+@replica_reads
 def api_get_projects():
     username = request.args.get('username')
+    cursor = request.args.get('cursor')
+    per_page = per_page_arg()
+    fields = parse_project_fields(request.args.get('fields'))
+    if fields is None:
+        return jsonify({'error': 'Unknown field', 'fields': list(PROJECT_API_FIELDS)}), 400
     
+    criteria = [Project.is_public == True]
     if username:
         user = User.query.filter_by(username=username).first()
         if not user:
             return jsonify({'error': 'User not found'}), 404
-        
-        projects = user.projects.filter_by(is_public=True).all()
+        criteria.append(Project.user_id == user.id)
+    
+    # A user's listing stays complete unless the client asks for pages
+    paged = not username or cursor is not None or 'per_page' in request.args
+    
+    listed = db.select(Project.id, Project.updated_at, Project.views, Project.user_id)\
+        .where(*criteria)
+    if paged:
+        listed, _ = keyset_window(listed, Project, cursor, per_page)
+    listed = listed.subquery()
+    
+    # Version of exactly the rows the payload lists (views are part of it)
+    version = db.session.execute(
+        db.select(
+            db.func.count(listed.c.id),
+            db.func.max(listed.c.updated_at),
+            db.func.sum(listed.c.views),
+            db.func.max(User.updated_at)
+        ).select_from(listed).outerjoin(User, User.id == listed.c.user_id)
+    ).one()
+    etag = page_etag('api_projects', username, cursor, per_page if paged else None, fields,
+                     *version)
+    # Removed rows and view counts change the ETag but no timestamp: no Last-Modified
+    last_modified = None
+    if is_fresh(etag, last_modified):
+        return conditional_response('', etag, last_modified)
+    
+    # Only the requested columns are selected, owners joined in the same query
+    stmt = project_api_select(fields).where(*criteria)
+    if paged:
+        page = keyset_paginate(stmt, Project, cursor, per_page)
+        rows = page.items
     else:
-        projects = Project.query.filter_by(is_public=True)\
-            .order_by(Project.created_at.desc())\
-            .limit(20).all()
-    
-    projects_data = [{
-        'id': p.id,
-        'title': p.title,
-        'slug': p.slug,
-        'description': p.short_description or p.description[:200] + '...',
-        'tech_stack': p.tech_list,
-        'views': p.views,
-        'created_at': p.created_at.isoformat() if p.created_at else None,
-        'user': {
-            'username': p.user.username,
-            'full_name': p.user.full_name,
-            'profile_pic': p.user.profile_pic
-        }
-    } for p in projects]
-    
-    return jsonify({'projects': projects_data})
+        page = None
+        rows = db.session.execute(stmt).all()
+    
+    technologies = technology_names([row.id for row in rows]) if 'tech_stack' in fields else None
+    payload = {'projects': [project_api_row(row, fields, technologies) for row in rows]}
+    if page is not None:
+        payload['next_cursor'] = page.next_cursor
+        payload['prev_cursor'] = page.prev_cursor
+    
+    return conditional_response(jsonify(payload), etag, last_modified)
+
+@portfolio_bp.route('/api/projects/export', methods=['GET'])
+def api_export_projects():
+    """Stream the public catalogue as newline-delimited JSON, one project per line."""
+    fields = parse_project_fields(request.args.get('fields'))
+    if fields is None:
+        return jsonify({'error': 'Unknown field', 'fields': list(PROJECT_API_FIELDS)}), 400
+    
+    criteria = [Project.is_public == True]
+    username = request.args.get('username')
+    if username:
+        user = User.query.filter_by(username=username).first()
+        if not user:
+            return jsonify({'error': 'User not found'}), 404
+        criteria.append(Project.user_id == user.id)
+    
+    stmt = project_api_select(fields).where(*criteria)\
+        .order_by(Project.created_at.desc(), Project.id.desc())\
+        .execution_options(yield_per=500)
+    
+    def generate():
+        # yield_per streams rows from the cursor in batches, so memory stays flat;
+        # technologies are looked up once per batch
+        for rows in db.session.execute(stmt).partitions():
+            technologies = technology_names([row.id for row in rows]) if 'tech_stack' in fields else None
+            for row in rows:
+                yield json.dumps(project_api_row(row, fields, technologies), separators=(',', ':')) + '\n'
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
 
 @portfolio_bp.route('/api/upload', methods=['POST'])
 @login_required
@@ -546,17 +665,37 @@ def api_upload_file():
     
     file = request.files['file']
     subfolder = request.form.get('type', 'projects')
+    if subfolder not in MEDIA_SUBFOLDERS:
+        return jsonify({'error': 'type must be one of ' + ', '.join(MEDIA_SUBFOLDERS)}), 400
     
     if file.filename == '':
         return jsonify({'error': 'No selected file'}), 400
     
-    filename = save_file(file, subfolder)
+    # No row owns the file yet: it is kept for UPLOAD_PENDING_TTL, then
+    # `flask expire-uploads` removes it unless a reference was taken
+    filename = save_file(file, subfolder, pending=True)
     
     if filename:
+        db.session.commit()
         return jsonify({
             'success': True,
             'filename': filename,
-            'url': f"/static/uploads/{subfolder}/{filename}"
+            'url': media_url(subfolder, filename),
+            'thumbnail_status': image_pipeline.status(subfolder, filename),
+            'expires_in': current_app.config['UPLOAD_PENDING_TTL']
         })
     else:
-        return jsonify({'error': 'Invalid file type'}), 400
\ No newline at end of file
+        return jsonify({'error': 'Invalid file type'}), 400
+
+@portfolio_bp.route('/api/upload/<subfolder>/<filename>/status', methods=['GET'])
+@login_required
+def api_upload_status(subfolder, filename):
+    if subfolder not in MEDIA_SUBFOLDERS:
+        abort(404)
+    
+    return jsonify({
+        'filename': filename,
+        'thumbnail_status': image_pipeline.status(subfolder, filename),
+        'thumbnail_url': thumbnail_url(subfolder, filename),
+        'srcset': image_srcset(subfolder, filename)
+    })
\ No newline at end of file
@@ -1,47 +1,26 @@
 import os
-import uuid
-from PIL import Image
 from flask import current_app
 import mimetypes
+from app.extensions import query_cache
+from app.images import make_thumbnail, thumbnail_path
+from app.storage import store_upload, release_upload
 
 def allowed_file(filename):
     allowed = current_app.config['ALLOWED_EXTENSIONS']
     return '.' in filename and \
            filename.rsplit('.', 1)[1].lower() in allowed
 
-def save_file(file, subfolder):
+def save_file(file, subfolder, pending=False):
     if not file or not allowed_file(file.filename):
         return None
     
-    # Generate unique filename
+    # Content-addressed by default: identical bytes are stored (and thumbnailed) once
     ext = file.filename.rsplit('.', 1)[1].lower()
-    filename = f"{uuid.uuid4().hex}.{ext}"
-    
-    # Create upload path
-    upload_folder = current_app.config['UPLOAD_FOLDER']
-    upload_path = os.path.join(upload_folder, subfolder, filename)
-    
-    # Save file
-    file.save(upload_path)
-    
-    # If it's an image, create thumbnail
-    if ext in ['jpg', 'jpeg', 'png', 'gif', 'webp']:
-        create_thumbnail(upload_path)
-    
-    return filename
+    return store_upload(file, subfolder, ext, pending=pending)
 
 def create_thumbnail(image_path, size=(300, 300)):
     try:
-        img = Image.open(image_path)
-        img.thumbnail(size, Image.Resampling.LANCZOS)
-        
-        # Save thumbnail
-        dir_name, file_name = os.path.split(image_path)
-        name, ext = os.path.splitext(file_name)
-        thumbnail_path = os.path.join(dir_name, f"{name}_thumb{ext}")
-        img.save(thumbnail_path)
-        
-        return thumbnail_path
+        return make_thumbnail(image_path, size)
     except Exception as e:
         current_app.logger.error(f"Error creating thumbnail: {e}")
         return None
@@ -49,65 +28,282 @@ def create_thumbnail(image_path, size=(300, 300)):
 def delete_file(filename, subfolder):
     if filename and filename != 'default-profile.jpg':
         try:
-            upload_folder = current_app.config['UPLOAD_FOLDER']
-            file_path = os.path.join(upload_folder, subfolder, filename)
-            
-            if os.path.exists(file_path):
-                os.remove(file_path)
-            
-            # Also delete thumbnail if exists
-            dir_name, file_name = os.path.split(file_path)
-            name, ext = os.path.splitext(file_name)
-            thumb_path = os.path.join(dir_name, f"{name}_thumb{ext}")
-            if os.path.exists(thumb_path):
-                os.remove(thumb_path)
+            # Bytes go once the last reference is released (thumbnail included)
+            release_upload(subfolder, filename)
         except Exception as e:
             current_app.logger.error(f"Error deleting file: {e}")
 
 def log_view(entity_type, entity_id, request):
-    from app.models import ViewLog, db
+    from app.models import ViewLog, ViewDailyRollup, db
+    from app.extensions import view_log_buffer
     from flask_login import current_user
+    from datetime import datetime
     
+    row = {
+        'entity_type': entity_type,
+        'entity_id': entity_id,
+        'ip_address': request.remote_addr,
+        'user_agent': request.user_agent.string[:500] if request.user_agent else None,
+        'referrer': request.referrer[:255] if request.referrer else None,
+        'timestamp': datetime.utcnow(),
+        'user_id': current_user.id if current_user.is_authenticated else None
+    }
+    
+    # Hand off to the background writer; it batches rows into multi-row inserts
+    if view_log_buffer.enabled:
+        view_log_buffer.put(row)
+        return
+    
+    # On its own connection, so the request's session isn't marked as having
+    # written and its remaining reads can stay on a replica
     try:
-        view_log = ViewLog(
-            entity_type=entity_type,
-            entity_id=entity_id,
-            ip_address=request.remote_addr,
-            user_agent=request.user_agent.string[:500] if request.user_agent else None,
-            referrer=request.referrer[:255] if request.referrer else None,
-            user_id=current_user.id if current_user.is_authenticated else None
-        )
-        db.session.add(view_log)
-        db.session.commit()
+        with db.engine.begin() as conn:
+            conn.execute(ViewLog.__table__.insert().values(row))
+            ViewDailyRollup.add_views(conn, [row])
     except Exception as e:
         current_app.logger.error(f"Error logging view: {e}")
-        db.session.rollback()
+
+def get_cached_page(key):
+    import time
+    from app.extensions import page_cache
+    from flask import g, session
+    from flask_login import current_user
+    
+    # Anything rendered from here on reads rows at least this new
+    g.page_cache_since = time.time()
+    # Pages render the viewer's nav bar and flashed messages, so only
+    # anonymous requests without pending flashes share cached HTML.
+    # Decided here, before rendering pops the flashes, for cache_page too
+    g.page_shareable = page_cache.enabled and not current_user.is_authenticated \
+        and '_flashes' not in session
+    if not g.page_shareable:
+        return None
+    page = page_cache.get(key)
+    if page is None:
+        # This render and its ETag get cached for everyone, so they must not
+        # come from a replica that hasn't caught up with the last write yet
+        from app.routing import primary_reads
+        primary_reads()
+    return page
+
+def cache_page(key, html, entity_id, tags, etag=None, last_modified=None):
+    from app.extensions import page_cache
+    from flask import g
+    
+    if not g.get('page_shareable'):
+        return
+    page_cache.set(key, (html, entity_id, etag, last_modified), tags=tags, size=len(html),
+                   since=g.get('page_cache_since'))
+
+def page_etag(*parts):
+    """Weak ETag over the given version parts, varied by viewer and pending flashes."""
+    import hashlib
+    from flask import session
+    from flask_login import current_user
+    
+    viewer = current_user.id if current_user.is_authenticated else None
+    flashes = session.get('_flashes')
+    return hashlib.sha1(repr((viewer, flashes) + parts).encode()).hexdigest()[:32]
+
+def is_fresh(etag, last_modified):
+    """True if the client's If-None-Match/If-Modified-Since already match."""
+    from flask import request
+    from werkzeug.http import is_resource_modified
+    
+    return not is_resource_modified(request.environ, etag=etag, last_modified=last_modified)
+
+def conditional_response(body, etag, last_modified, mimetype=None):
+    from flask import make_response, request
+    from flask_login import current_user
+    
+    response = make_response(body)
+    if mimetype:
+        response.mimetype = mimetype
+    response.set_etag(etag, weak=True)
+    if last_modified:
+        response.last_modified = last_modified
+    # Let browsers and the CDN keep a copy but revalidate it on every use
+    response.cache_control.no_cache = True
+    if current_user.is_authenticated:
+        response.cache_control.private = True
+    else:
+        response.cache_control.public = True
+    response.vary.add('Cookie')
+    return response.make_conditional(request)
+
+def _latest(*timestamps):
+    timestamps = [t for t in timestamps if t is not None]
+    return max(timestamps) if timestamps else None
+
+def portfolio_validator(username):
+    """(user_id, etag, last_modified) for a public portfolio page, or None if unknown.
+    
+    Runs one query over indexed columns instead of the page's own queries.
+    Counts are included so that deletions change the ETag too. No timestamp
+    moves when a row is deleted (or a skill or achievement edited), so the
+    page gets no Last-Modified and is revalidated by ETag alone.
+    """
+    from app.models import User, Project, BlogPost, Skill, Achievement, db
+    
+    def summary(model, timestamp, *criteria):
+        return (
+            db.select(db.func.max(timestamp)).where(model.user_id == User.id, *criteria)
+            .scalar_subquery(),
+            db.select(db.func.count(model.id)).where(model.user_id == User.id, *criteria)
+            .scalar_subquery()
+        )
+    
+    row = db.session.execute(
+        db.select(
+            User.id, User.updated_at,
+            *summary(Project, Project.updated_at, Project.is_public == True),
+            *summary(BlogPost, BlogPost.updated_at, BlogPost.is_published == True),
+            *summary(Skill, Skill.created_at),
+            *summary(Achievement, Achievement.created_at)
+        ).where(User.username == username)
+    ).first()
+    if row is None:
+        return None
+    
+    return row[0], page_etag('portfolio', *row), None
+
+def project_validator(username, slug):
+    from app.models import User, Project, db
+    
+    row = db.session.execute(
+        db.select(Project.id, Project.updated_at, User.updated_at)
+        .join(User, User.id == Project.user_id)
+        .where(User.username == username, Project.slug == slug, Project.is_public == True)
+    ).first()
+    if row is None:
+        return None
+    
+    return row[0], page_etag('project', *row), _latest(row[1], row[2])
+
+def blog_validator(username, slug):
+    from app.models import User, BlogPost, db
+    
+    row = db.session.execute(
+        db.select(BlogPost.id, BlogPost.updated_at, User.updated_at)
+        .join(User, User.id == BlogPost.user_id)
+        .where(User.username == username, BlogPost.slug == slug, BlogPost.is_published == True)
+    ).first()
+    if row is None:
+        return None
+    
+    return row[0], page_etag('blog', *row), _latest(row[1], row[2])
+
+PROJECT_API_FIELDS = ('id', 'title', 'slug', 'description', 'tech_stack', 'views',
+                      'created_at', 'user')
+
+def parse_project_fields(value):
+    """Validate a ``fields=`` list; returns the fields in canonical order or None if invalid."""
+    if not value:
+        return PROJECT_API_FIELDS
+    requested = {field.strip() for field in value.split(',') if field.strip()}
+    if not requested or not requested <= set(PROJECT_API_FIELDS):
+        return None
+    return tuple(field for field in PROJECT_API_FIELDS if field in requested)
+
+def project_api_select(fields):
+    """SELECT of only the columns the requested API fields need, owner joined in.
+    
+    ``id`` and ``created_at`` are always selected because pagination keys on them.
+    """
+    from app.models import Project, User, db
+    
+    columns = {
+        'id': [Project.id],
+        'title': [Project.title],
+        'slug': [Project.slug],
+        # The plain-text summary rendered at write time
+        'description': [Project.summary],
+        # Read from project_technologies by technology_names(), in stack order
+        'tech_stack': [],
+        'views': [Project.views],
+        'created_at': [Project.created_at],
+        'user': [User.username.label('user_username'),
+                 User.full_name.label('user_full_name'),
+                 User.profile_pic.label('user_profile_pic')],
+    }
+    
+    selected = [Project.id, Project.created_at]
+    for field in fields:
+        for column in columns[field]:
+            if not any(column is existing for existing in selected):
+                selected.append(column)
+    
+    stmt = db.select(*selected).select_from(Project)
+    if 'user' in fields:
+        stmt = stmt.join(User, User.id == Project.user_id)
+    return stmt
+
+def project_api_row(row, fields, technologies=None):
+    """JSON for one row of ``project_api_select``; ``technologies`` maps project ids to names."""
+    data = {}
+    for field in fields:
+        if field == 'description':
+            data['description'] = row.summary
+        elif field == 'tech_stack':
+            data['tech_stack'] = (technologies or {}).get(row.id, [])
+        elif field == 'created_at':
+            data['created_at'] = row.created_at.isoformat() if row.created_at else None
+        elif field == 'user':
+            data['user'] = {
+                'username': row.user_username,
+                'full_name': row.user_full_name,
+                'profile_pic': row.user_profile_pic
+            }
+        else:
+            data[field] = getattr(row, field)
+    return data
 
 def get_view_stats(user_id, entity_type=None, days=30):
-    from app.models import ViewLog, db
     from datetime import datetime, timedelta
+    
+    since_day = (datetime.utcnow() - timedelta(days=days)).date()
+    return _view_stats(user_id, entity_type, since_day)
+
+# Rollups are written through Core by the view-log buffer, so only the TTL refreshes them
+@query_cache.memoize(tags=lambda user_id, entity_type, since_day: [f'user:{user_id}'], ttl=60)
+def _view_stats(user_id, entity_type, since_day):
+    from app.models import ViewDailyRollup, db
     from sqlalchemy import func
     
-    query = ViewLog.query.filter(ViewLog.user_id == user_id)
+    # Reads the per-day rollup rather than raw view_logs, so the cost depends
+    # on the number of days and entities, not on how many views were logged
+    total_query = db.session.query(
+        func.coalesce(func.sum(ViewDailyRollup.count), 0)
+    ).filter(
+        ViewDailyRollup.user_id == user_id,
+        ViewDailyRollup.day >= since_day
+    )
     
     if entity_type:
-        query = query.filter(ViewLog.entity_type == entity_type)
-    
-    since_date = datetime.utcnow() - timedelta(days=days)
-    query = query.filter(ViewLog.timestamp >= since_date)
+        total_query = total_query.filter(ViewDailyRollup.entity_type == entity_type)
     
     # Get daily counts
     daily_counts = db.session.query(
-        func.date(ViewLog.timestamp).label('date'),
-        func.count(ViewLog.id).label('count')
+        ViewDailyRollup.day.label('date'),
+        func.sum(ViewDailyRollup.count).label('count')
     ).filter(
-        ViewLog.user_id == user_id,
-        ViewLog.timestamp >= since_date
+        ViewDailyRollup.user_id == user_id,
+        ViewDailyRollup.day >= since_day
     ).group_by(
-        func.date(ViewLog.timestamp)
+        ViewDailyRollup.day
     ).order_by('date').all()
     
     return {
-        'total_views': query.count(),
+        'total_views': total_query.scalar(),
         'daily_counts': [{'date': str(d[0]), 'count': d[1]} for d in daily_counts]
-    }
\ No newline at end of file
+    }
+
+@query_cache.memoize(tags=lambda user_id, limit: [f'user:{user_id}'], ttl=60)
+def get_top_projects(user_id, limit=5):
+    from app.models import Project, db
+    
+    return db.session.execute(
+        db.select(Project.id, Project.title, Project.slug, Project.views)
+        .where(Project.user_id == user_id)
+        .order_by(Project.views.desc()).limit(limit)
+    ).all()
\ No newline at end of file
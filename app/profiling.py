@@ -0,0 +1,197 @@
+import re
+import threading
+import time
+from collections import Counter
+from flask import before_render_template, g, has_request_context, request, template_rendered
+from sqlalchemy import event
+
+# Expanded IN lists vary in length between requests; fold them so they group
+_PLACEHOLDER_LIST = re.compile(r'\(\s*(?:\?|%\(\w+\)s|:\w+)(?:\s*,\s*(?:\?|%\(\w+\)s|:\w+))+\s*\)')
+
+
+def normalize_statement(statement):
+    return _PLACEHOLDER_LIST.sub('(?)', ' '.join(statement.split()))
+
+
+class RequestProfiler:
+    """Opt-in per-request profiling (PROFILING_ENABLED).
+
+    Counts and times every SQL statement a request runs (cursor execute
+    events on the app's engines) and every template it renders (Flask's
+    template signals), flags statements repeated at least
+    PROFILING_N_PLUS_ONE_THRESHOLD times as likely N+1 queries, and reports
+    it all in a ``Server-Timing`` header. Totals are aggregated per
+    endpoint in this process for the ``/admin/perf`` page.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self.enabled = False
+        self._endpoints = {}
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('PROFILING_ENABLED', False)
+        app.config.setdefault('PROFILING_N_PLUS_ONE_THRESHOLD', 5)
+        app.config.setdefault('PROFILING_SERVER_TIMING', True)
+
+        self.app = app
+        self.enabled = app.config['PROFILING_ENABLED']
+        self.threshold = app.config['PROFILING_N_PLUS_ONE_THRESHOLD']
+        self.server_timing = app.config['PROFILING_SERVER_TIMING']
+        self.reset()
+
+        app.extensions['profiler'] = self
+        if not self.enabled:
+            return
+
+        from app.extensions import db
+        with app.app_context():
+            for engine in db.engines.values():
+                event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+                event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+        before_render_template.connect(_before_render, app)
+        template_rendered.connect(_after_render, app)
+        app.before_request(self._start)
+        app.after_request(self._finish)
+
+    def stats(self, sort='total', limit=25):
+        """Per-endpoint aggregates, worst first by ``sort`` ('total', 'avg', 'max' or 'queries')."""
+        with self._lock:
+            rows = []
+            for endpoint, s in self._endpoints.items():
+                n = s['requests']
+                rows.append({
+                    'endpoint': endpoint,
+                    'requests': n,
+                    'total_ms': round(s['time'] * 1000, 1),
+                    'avg_ms': round(s['time'] / n * 1000, 2),
+                    'max_ms': round(s['max_time'] * 1000, 2),
+                    'avg_queries': round(s['queries'] / n, 1),
+                    'max_queries': s['max_queries'],
+                    'avg_sql_ms': round(s['sql_time'] / n * 1000, 2),
+                    'avg_template_ms': round(s['template_time'] / n * 1000, 2),
+                    'n_plus_one_requests': s['n_plus_one'],
+                    'worst_repeat': s['worst_repeat'],
+                })
+        key = {'avg': 'avg_ms', 'max': 'max_ms', 'queries': 'avg_queries'}.get(sort, 'total_ms')
+        rows.sort(key=lambda row: row[key], reverse=True)
+        return rows[:limit]
+
+    def reset(self):
+        with self._lock:
+            self._endpoints = {}
+
+    def _start(self):
+        g.profile = {
+            'started': time.perf_counter(),
+            'queries': 0,
+            'sql_time': 0.0,
+            'statements': Counter(),
+            'template_time': 0.0,
+            'render_stack': [],
+            'render_spans': [],
+        }
+
+    def _finish(self, response):
+        profile = g.pop('profile', None)
+        if profile is None:
+            return response
+
+        elapsed = time.perf_counter() - profile['started']
+        repeats = [(statement, count) for statement, count in profile['statements'].most_common()
+                   if count >= self.threshold]
+        if repeats:
+            self.app.logger.warning(
+                f"Possible N+1 on {request.endpoint}: " +
+                '; '.join(f"{count}x {statement[:200]}" for statement, count in repeats[:3])
+            )
+        self._record(request.endpoint or request.path, elapsed, profile, repeats)
+
+        if self.server_timing:
+            metrics = [
+                f'sql;dur={profile["sql_time"] * 1000:.1f};desc="{profile["queries"]} queries"',
+                f'tpl;dur={profile["template_time"] * 1000:.1f};desc="Templates"',
+                f'app;dur={elapsed * 1000:.1f};desc="Total"',
+            ]
+            if repeats:
+                metrics.append(f'nplus1;desc="{len(repeats)} repeated statements, '
+                               f'worst {repeats[0][1]}x"')
+            response.headers.add('Server-Timing', ', '.join(metrics))
+        return response
+
+    def _record(self, endpoint, elapsed, profile, repeats):
+        with self._lock:
+            s = self._endpoints.setdefault(endpoint, {
+                'requests': 0, 'time': 0.0, 'max_time': 0.0, 'queries': 0, 'max_queries': 0,
+                'sql_time': 0.0, 'template_time': 0.0, 'n_plus_one': 0, 'worst_repeat': None,
+            })
+            s['requests'] += 1
+            s['time'] += elapsed
+            s['max_time'] = max(s['max_time'], elapsed)
+            s['queries'] += profile['queries']
+            s['max_queries'] = max(s['max_queries'], profile['queries'])
+            s['sql_time'] += profile['sql_time']
+            s['template_time'] += profile['template_time']
+            if repeats:
+                s['n_plus_one'] += 1
+                statement, count = repeats[0]
+                if s['worst_repeat'] is None or count > s['worst_repeat']['count']:
+                    s['worst_repeat'] = {'statement': statement, 'count': count}
+
+
+def _current_profile():
+    return g.get('profile') if has_request_context() else None
+
+
+# Start times live on the statement's execution context, not the connection:
+# a statement that raises gets no after_cursor_execute, and its start time
+# must not be charged to the next statement on that connection
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None and _current_profile() is not None:
+        context.profile_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = _current_profile()
+    started = getattr(context, 'profile_started', None)
+    if profile is None or started is None:
+        return
+    context.profile_started = None
+    profile['queries'] += 1
+    profile['sql_time'] += time.perf_counter() - started
+    profile['statements'][normalize_statement(statement)] += 1
+
+
+# A template that raises sends before_render_template but never template_rendered,
+# so its stack entry is stale. Entries carry their template, and a finishing
+# render drops any left above its own; time is counted from the spans already
+# charged rather than from the stack depth, so a stale entry below doesn't
+# stop the renders after it from counting
+
+def _before_render(sender, template, context, **extra):
+    profile = _current_profile()
+    if profile is not None:
+        profile['render_stack'].append((template, time.perf_counter()))
+
+
+def _after_render(sender, template, context, **extra):
+    profile = _current_profile()
+    if profile is None:
+        return
+    stack = profile['render_stack']
+    while stack:
+        rendered, started = stack.pop()
+        if rendered is template:
+            break
+    else:
+        return
+    # Nested renders finish first and were charged already; replace their spans with this one
+    elapsed = time.perf_counter() - started
+    spans = profile['render_spans']
+    nested = sum(duration for start, duration in spans if start >= started)
+    profile['render_spans'] = [span for span in spans if span[0] < started] + [(started, elapsed)]
+    profile['template_time'] += elapsed - nested
@@ -0,0 +1,159 @@
+"""Query-plan regression check for the main, portfolio and admin blueprints.
+
+Every route of those blueprints is requested against a seeded in-memory
+SQLite database. Each SELECT/UPDATE/DELETE the request issues is re-run
+under ``EXPLAIN QUERY PLAN`` and any plain ``SCAN <table>`` step, i.e. a
+full table scan that uses no index, is reported. A route that raises or
+answers with a 5xx has not been checked and is reported as a failure.
+"""
+import re
+from datetime import date
+from jinja2 import BaseLoader, ChoiceLoader
+from sqlalchemy import event
+
+CHECKED_BLUEPRINTS = ('main', 'portfolio', 'admin')
+
+# Aggregates over a whole table are scans by definition and are tracked here
+# explicitly, so that new full scans still fail the check
+ALLOWED_SCANS = {
+    ('admin.analytics', 'users'),
+}
+
+_FULL_SCAN = re.compile(r'^SCAN (\w+)(?: AS \w+)?$')
+
+
+class _BlankTemplates(BaseLoader):
+    """Renders templates that aren't in the tree as empty pages, so those routes still run."""
+
+    def get_source(self, environment, template):
+        return '', None, lambda: True
+
+
+def _seed(db):
+    from app.models import User, Project, BlogPost, Achievement, Skill
+
+    admin = User(username='admin', email='admin@devfolio.com', password='admin123',
+                 is_admin=True)
+    dev = User(username='dev', email='dev@example.com', password='dev12345')
+    db.session.add_all([admin, dev])
+    db.session.flush()
+
+    project = Project(user_id=admin.id, title='Plan Check', slug='plan-check',
+                      description='Project used by the query-plan check.',
+                      tech_stack='Python, Flask', is_public=True, is_featured=True)
+    project.sync_technologies()
+    db.session.add_all([
+        project,
+        BlogPost(user_id=admin.id, title='Plan Check', slug='plan-check',
+                 content='Post used by the query-plan check.', is_published=True),
+        Achievement(user_id=admin.id, title='Plan Check', category='award',
+                    issue_date=date.today()),
+        Skill(user_id=admin.id, name='Python', proficiency=5),
+    ])
+    db.session.commit()
+    return admin
+
+
+def _url_values(admin):
+    from app.models import Project, BlogPost, Achievement, Skill
+
+    return {
+        'username': admin.username,
+        'slug': 'plan-check',
+        'user_id': admin.id + 1,
+        'project_id': Project.query.first().id,
+        'post_id': BlogPost.query.first().id,
+        'achievement_id': Achievement.query.first().id,
+        'skill_id': Skill.query.first().id,
+        'subfolder': 'projects',
+        'filename': 'plan-check.png',
+        'width': 320,
+        'height': 240,
+        'name': 'python',
+    }
+
+
+def _routes(app, values):
+    """Yield (endpoint, method, url) for every checked route, GETs first."""
+    from flask import url_for
+
+    rules = [r for r in app.url_map.iter_rules()
+             if r.endpoint.split('.')[0] in CHECKED_BLUEPRINTS]
+    for method in ('GET', 'POST'):
+        for rule in rules:
+            if method not in rule.methods:
+                continue
+            # Routes that remove rows go last so they don't starve the others
+            if method == 'POST' and rule.endpoint.rsplit('.', 1)[-1].startswith('delete'):
+                continue
+            with app.test_request_context():
+                url = url_for(rule.endpoint, **{a: values[a] for a in rule.arguments})
+            yield rule.endpoint, method, url
+    for rule in rules:
+        if 'POST' in rule.methods and rule.endpoint.rsplit('.', 1)[-1].startswith('delete'):
+            with app.test_request_context():
+                url = url_for(rule.endpoint, **{a: values[a] for a in rule.arguments})
+            yield rule.endpoint, 'POST', url
+
+
+def check_query_plans(app):
+    """Return (findings, failures).
+
+    ``findings`` lists (endpoint, table, statement, plan) full scans;
+    ``failures`` lists (endpoint, method, url, error) for routes that failed.
+    """
+    from app.extensions import db, query_cache
+
+    captured = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if not executemany and statement.lstrip().split(None, 1)[0].upper() in \
+                ('SELECT', 'UPDATE', 'DELETE'):
+            captured.append((statement, parameters))
+
+    findings = []
+    failures = []
+    app.jinja_env.loader = ChoiceLoader([app.jinja_env.loader, _BlankTemplates()])
+    with app.app_context():
+        # Subqueries and CTEs show up as SCAN steps too; only real tables count
+        tables = set(db.metadata.tables)
+        db.create_all()
+        admin = _seed(db)
+        values = _url_values(admin)
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session['_user_id'] = str(admin.id)
+            session['_fresh'] = True
+
+        engine = db.engine
+        for endpoint, method, url in list(_routes(app, values)):
+            captured.clear()
+            # Memoized queries must run to be checked
+            query_cache.clear()
+            event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+            try:
+                response = client.open(url, method=method)
+                if response.status_code >= 500:
+                    failures.append((endpoint, method, url, f'HTTP {response.status_code}'))
+            except Exception as e:
+                failures.append((endpoint, method, url, f'{type(e).__name__}: {e}'))
+            finally:
+                event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+                db.session.rollback()
+
+            seen = set()
+            with engine.connect() as conn:
+                for statement, parameters in captured:
+                    if statement in seen:
+                        continue
+                    seen.add(statement)
+                    plan = conn.exec_driver_sql(
+                        f'EXPLAIN QUERY PLAN {statement}', parameters
+                    ).fetchall()
+                    details = [row[-1] for row in plan]
+                    for detail in details:
+                        match = _FULL_SCAN.match(detail)
+                        if match and match.group(1) in tables and \
+                                (endpoint, match.group(1)) not in ALLOWED_SCANS:
+                            findings.append((endpoint, match.group(1), statement, details))
+    return findings, failures
@@ -0,0 +1,110 @@
+"""Render-at-write for project descriptions and blog post bodies.
+
+The stored ``description``/``content`` is what the author typed. Everything
+pages and the API show is derived from it once, when the row is written:
+sanitized HTML, a plain-text summary, word count and reading time, stamped
+with ``RENDERER_VERSION``. Bump the version whenever the output of this
+module changes and run ``flask rerender-content`` to bring old rows up to date.
+"""
+import html
+import math
+import re
+import bleach
+from sqlalchemy import event
+
+RENDERER_VERSION = 1
+
+PROJECT_TAGS = ['p', 'br', 'b', 'i', 'strong', 'em', 'ul', 'ol', 'li', 'code', 'pre']
+
+POST_TAGS = ['p', 'br', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6',
+             'b', 'i', 'strong', 'em', 'ul', 'ol', 'li',
+             'code', 'pre', 'blockquote', 'a', 'img']
+POST_ATTRIBUTES = {'a': ['href', 'title'], 'img': ['src', 'alt', 'title']}
+
+SUMMARY_LENGTH = 200
+WORDS_PER_MINUTE = 200
+
+# Block boundaries separate words even when the markup has no whitespace there
+_BLOCK_TAG = re.compile(r'(?=</?(?:p|br|h[1-6]|li|ul|ol|pre|blockquote|div|img)\b)', re.IGNORECASE)
+
+
+def plain_text(markup):
+    text = html.unescape(bleach.clean(_BLOCK_TAG.sub(' ', markup or ''), tags=[], strip=True))
+    return ' '.join(text.split())
+
+
+def summarize(text, length=SUMMARY_LENGTH):
+    """Cut ``text`` at a word boundary, marking the cut with an ellipsis."""
+    if len(text) <= length:
+        return text
+    cut = text[:length].rsplit(' ', 1)[0] or text[:length]
+    return cut.rstrip(' ,.;:') + '...'
+
+
+def render_fields(markup, tags, attributes=None, summary=None):
+    """Derived columns for one body of user HTML, keyed by their model attribute suffix."""
+    text = plain_text(markup)
+    words = len(text.split())
+    return {
+        'html': bleach.clean(markup or '', tags=tags, attributes=attributes or {}, strip=True),
+        'summary': (summary or '').strip() or summarize(text),
+        'word_count': words,
+        'reading_time': max(math.ceil(words / WORDS_PER_MINUTE), 1),
+        'render_version': RENDERER_VERSION,
+    }
+
+
+def project_fields(description, short_description=None):
+    fields = render_fields(description, PROJECT_TAGS, summary=short_description)
+    fields['description_html'] = fields.pop('html')
+    return fields
+
+
+def post_fields(content, excerpt=None):
+    fields = render_fields(content, POST_TAGS, POST_ATTRIBUTES, summary=excerpt)
+    fields['content_html'] = fields.pop('html')
+    return fields
+
+
+def render(target):
+    """Fill a Project's or BlogPost's derived columns from its source fields."""
+    from app.models import Project
+
+    if isinstance(target, Project):
+        fields = project_fields(target.description, target.short_description)
+    else:
+        fields = post_fields(target.content, target.excerpt)
+    for name, value in fields.items():
+        setattr(target, name, value)
+
+
+_SOURCES = {
+    'Project': ('description', 'short_description'),
+    'BlogPost': ('content', 'excerpt'),
+}
+
+_registered = False
+
+
+def register_render_hooks(db):
+    global _registered
+    if _registered:
+        return
+    _registered = True
+
+    from sqlalchemy import inspect
+    from app.models import Project, BlogPost
+
+    def render_on_insert(mapper, connection, target):
+        render(target)
+
+    def render_on_update(mapper, connection, target):
+        state = inspect(target)
+        changed = any(state.attrs[name].history.has_changes()
+                      for name in _SOURCES[type(target).__name__])
+        if changed or target.render_version != RENDERER_VERSION:
+            render(target)
+
+    for model in (Project, BlogPost):
+        event.listen(model, 'before_insert', render_on_insert)
+        event.listen(model, 'before_update', render_on_update)
@@ -0,0 +1,222 @@
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+
+def resize_image(source_path, dest_path, size):
+    """Write a copy of an image scaled down to fit within ``size``.
+
+    Same Pillow call as the upload thumbnails; images already smaller than
+    the box are re-encoded at their own size, never enlarged. The file is
+    written under a temporary name and moved into place, so readers never
+    see a partial image.
+    """
+    from PIL import Image
+
+    folder = os.path.dirname(dest_path)
+    os.makedirs(folder, exist_ok=True)
+    ext = os.path.splitext(dest_path)[1]
+    fd, tmp_path = tempfile.mkstemp(dir=folder, prefix='.resize-', suffix=ext)
+    try:
+        with os.fdopen(fd, 'wb') as out, Image.open(source_path) as img:
+            img.thumbnail(tuple(size), Image.Resampling.LANCZOS)
+            img.save(out, format=Image.registered_extensions()[ext.lower()])
+        os.replace(tmp_path, dest_path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return os.path.getsize(dest_path)
+
+
+def parse_sizes(sizes):
+    """Turn ``['640x480', (320, 240)]`` into a set of (width, height) tuples."""
+    parsed = set()
+    for size in sizes:
+        if isinstance(size, str):
+            width, height = size.lower().split('x')
+            size = (int(width), int(height))
+        parsed.add(tuple(size))
+    return parsed
+
+
+class ImageResizer:
+    """Resizes uploads on first request and keeps the variants in a disk cache.
+
+    Only sizes listed in IMAGE_RESIZE_SIZES are produced. Concurrent
+    requests for the same variant wait on a per-key lock, so it is made
+    once per process. The cache directory is held under
+    IMAGE_RESIZE_CACHE_MAX_BYTES by evicting the least recently served
+    variants; serving one touches its mtime, so the order is rebuilt from
+    disk on first use and every IMAGE_RESIZE_RESCAN_INTERVAL seconds, which
+    also accounts for variants written by other worker processes.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self.cache_dir = None
+        self.sizes = set()
+        self._entries = None   # relative path -> size in bytes, oldest first
+        self._total = 0
+        self._scanned_at = 0.0
+        self._lock = threading.Lock()
+        self._key_locks = {}   # key -> [lock, waiters]
+        self._reset_stats()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('IMAGE_RESIZE_SIZES', ('160x160', '320x240', '640x480', '1280x720'))
+        app.config.setdefault('IMAGE_RESIZE_CACHE_DIR', os.path.join(app.instance_path, 'image-cache'))
+        app.config.setdefault('IMAGE_RESIZE_CACHE_MAX_BYTES', 268435456)
+        app.config.setdefault('IMAGE_RESIZE_RESCAN_INTERVAL', 300)
+
+        self.app = app
+        self.sizes = parse_sizes(app.config['IMAGE_RESIZE_SIZES'])
+        self.cache_dir = os.path.abspath(app.config['IMAGE_RESIZE_CACHE_DIR'])
+        self.max_bytes = app.config['IMAGE_RESIZE_CACHE_MAX_BYTES']
+        self.rescan_interval = app.config['IMAGE_RESIZE_RESCAN_INTERVAL']
+        with self._lock:
+            self._entries = None
+            self._total = 0
+        self._reset_stats()
+
+        app.extensions['image_resizer'] = self
+        app.add_template_global(resized_url)
+
+    def allowed(self, width, height):
+        return (width, height) in self.sizes
+
+    def variant(self, width, height, subfolder, filename, source_path):
+        """Path of the cached variant, creating it first if needed."""
+        key = f"{width}x{height}/{subfolder}/{filename}"
+        path = os.path.join(self.cache_dir, key)
+
+        if self._fresh(path, source_path):
+            self._touch(key, path)
+            return path
+
+        lock = self._acquire(key)
+        try:
+            # Someone else may have made it while we waited
+            if self._fresh(path, source_path):
+                self._touch(key, path)
+                return path
+            started = time.monotonic()
+            size = resize_image(source_path, path, (width, height))
+            with self._lock:
+                self.generated += 1
+                self.generate_time += time.monotonic() - started
+            self._add(key, size)
+        finally:
+            self._release(key, lock)
+        return path
+
+    def discard(self, subfolder, filename):
+        """Drop every cached variant of an upload."""
+        for width, height in self.sizes:
+            key = f"{width}x{height}/{subfolder}/{filename}"
+            path = os.path.join(self.cache_dir, key)
+            with self._lock:
+                if self._entries is not None and key in self._entries:
+                    self._total -= self._entries.pop(key)
+            if os.path.exists(path):
+                os.remove(path)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries) if self._entries is not None else 0,
+                'bytes': self._total,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'generated': self.generated,
+                'evictions': self.evictions,
+                'avg_generate_ms': round(self.generate_time / self.generated * 1000, 2)
+                if self.generated else 0.0,
+            }
+
+    def _fresh(self, path, source_path):
+        try:
+            return os.stat(path).st_mtime_ns >= os.stat(source_path).st_mtime_ns
+        except OSError:
+            return False
+
+    def _touch(self, key, path):
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        with self._lock:
+            self.hits += 1
+            if self._entries is not None and key in self._entries:
+                self._entries.move_to_end(key)
+
+    def _add(self, key, size):
+        self._scan_if_due()
+        evicted = []
+        with self._lock:
+            self._total -= self._entries.pop(key, 0)
+            self._entries[key] = size
+            self._total += size
+            while self._total > self.max_bytes and len(self._entries) > 1:
+                oldest, oldest_size = self._entries.popitem(last=False)
+                self._total -= oldest_size
+                evicted.append(oldest)
+            self.evictions += len(evicted)
+        for oldest in evicted:
+            try:
+                os.remove(os.path.join(self.cache_dir, oldest))
+            except OSError:
+                pass
+
+    def _scan_if_due(self):
+        now = time.monotonic()
+        if self._entries is not None and now - self._scanned_at < self.rescan_interval:
+            return
+
+        found = []
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if name.startswith('.resize-'):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                found.append((st.st_mtime_ns, os.path.relpath(path, self.cache_dir), st.st_size))
+        found.sort()
+
+        with self._lock:
+            self._entries = OrderedDict((key.replace(os.sep, '/'), size) for _, key, size in found)
+            self._total = sum(self._entries.values())
+            self._scanned_at = now
+
+    def _acquire(self, key):
+        with self._lock:
+            entry = self._key_locks.setdefault(key, [threading.Lock(), 0])
+            entry[1] += 1
+        entry[0].acquire()
+        return entry
+
+    def _release(self, key, entry):
+        entry[0].release()
+        with self._lock:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self._key_locks[key]
+
+    def _reset_stats(self):
+        self.hits = 0
+        self.generated = 0
+        self.evictions = 0
+        self.generate_time = 0.0
+
+
+def resized_url(width, height, subfolder, filename):
+    from flask import url_for
+    return url_for('main.resized_image', width=width, height=height,
+                   subfolder=subfolder, filename=filename)
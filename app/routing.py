@@ -0,0 +1,136 @@
+"""Read/write split between the primary database and read replicas.
+
+Replicas are ordinary Flask-SQLAlchemy binds listed in
+SQLALCHEMY_REPLICA_BINDS. Views decorated with ``@replica_reads`` send
+their SELECTs to one replica, picked once per request; everything else
+goes to the primary, as do:
+
+* any statement that is not a plain SELECT, ``session.connection()``
+  and flushes, and every read after the session has written, so a route
+  sees its own writes;
+* the whole of any request from a user who committed a write from a
+  non-replica route within the last SQLALCHEMY_REPLICA_STICKY_SECONDS,
+  so they see their edits even while the replicas lag;
+* anything run inside ``use_primary()``, and the rest of a request
+  after ``primary_reads()``; results that go into a shared cache are
+  read this way so a lagging replica can't refill it with stale rows.
+
+Without replica binds every statement goes to the primary as before.
+Locally, point the replica binds at SQLite files and copy the primary
+into them with ``flask sync-replicas``.
+"""
+import functools
+import random
+import sqlite3
+import time
+from contextlib import contextmanager
+from flask import current_app, g, has_request_context, session as flask_session
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.sql import CompoundSelect, Select
+from sqlalchemy.sql.dml import UpdateBase
+
+STICKY_KEY = '_db_primary_until'
+
+
+def replica_reads(view):
+    """Let a read-only view run its SELECTs on a replica."""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        g.db_replica_reads = True
+        return view(*args, **kwargs)
+    return wrapper
+
+
+@contextmanager
+def use_primary():
+    """Send every statement in the block to the primary."""
+    from app.extensions import db
+
+    info = db.session().info
+    info['primary_depth'] = info.get('primary_depth', 0) + 1
+    try:
+        yield
+    finally:
+        info['primary_depth'] -= 1
+
+
+def primary_reads():
+    """Send the rest of this request's reads to the primary."""
+    g.db_primary_reads = True
+
+
+class RoutingSession(Session):
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None:
+            if isinstance(clause, UpdateBase):
+                self.info['wrote'] = True
+            elif isinstance(clause, (Select, CompoundSelect)) and self._reads_from_replica(clause):
+                return self._db.engines[self.info['replica']]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+    def _reads_from_replica(self, clause):
+        if self._flushing or self.info.get('wrote') or self.info.get('primary_depth'):
+            return False
+        if not has_request_context() or not g.get('db_replica_reads') or g.get('db_primary_reads'):
+            return False
+        if getattr(clause, '_for_update_arg', None) is not None:
+            return False
+        if flask_session.get(STICKY_KEY, 0) > time.time():
+            return False
+
+        if 'replica' not in self.info:
+            replicas = current_app.config['SQLALCHEMY_REPLICA_BINDS']
+            self.info['replica'] = random.choice(replicas) if replicas else None
+        return self.info['replica'] is not None
+
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _mark_written(session, flush_context):
+    session.info['wrote'] = True
+
+
+@event.listens_for(RoutingSession, 'after_commit')
+def _stick_to_primary(session):
+    # View logging from read-only pages doesn't need read-your-writes
+    if not session.info.get('wrote') or not has_request_context() or g.get('db_replica_reads'):
+        return
+    seconds = current_app.config['SQLALCHEMY_REPLICA_STICKY_SECONDS']
+    flask_session[STICKY_KEY] = time.time() + seconds
+
+
+def init_replicas(app):
+    app.config.setdefault('SQLALCHEMY_REPLICA_BINDS', [])
+    app.config.setdefault('SQLALCHEMY_REPLICA_STICKY_SECONDS', 10)
+
+    binds = app.config.get('SQLALCHEMY_BINDS') or {}
+    missing = [key for key in app.config['SQLALCHEMY_REPLICA_BINDS'] if key not in binds]
+    if missing:
+        raise ValueError(f"Replica binds missing from SQLALCHEMY_BINDS: {', '.join(missing)}")
+
+
+def sync_sqlite_replicas(db):
+    """Copy a SQLite primary into each SQLite replica file; returns the bind keys copied."""
+    primary = db.engines[None]
+    if primary.url.get_backend_name() != 'sqlite':
+        return []
+
+    copied = []
+    source = sqlite3.connect(primary.url.database)
+    try:
+        for key in current_app.config['SQLALCHEMY_REPLICA_BINDS']:
+            engine = db.engines[key]
+            if engine.url.get_backend_name() != 'sqlite':
+                continue
+            # Close pooled connections so they reopen on the new copy
+            engine.dispose()
+            target = sqlite3.connect(engine.url.database)
+            try:
+                source.backup(target)
+            finally:
+                target.close()
+            copied.append(key)
+    finally:
+        source.close()
+    return copied
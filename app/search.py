@@ -0,0 +1,195 @@
+"""Full-text search over public projects and published blog posts (SQLite FTS5).
+
+Rows of the ``search_index`` virtual table are keyed by a rowid derived
+from the entity, so the ORM hooks below can replace or delete a document
+without scanning the index. Text is indexed as plain text, so the snippets
+that come back only ever contain the highlight markers added here.
+"""
+import re
+from markupsafe import Markup, escape
+from sqlalchemy import DDL, event, text
+
+SEARCH_TABLE = 'search_index'
+
+CREATE_SEARCH_TABLE = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5("
+    "entity_type UNINDEXED, entity_id UNINDEXED, user_id UNINDEXED, "
+    "title, summary, body, tags, tokenize='porter unicode61')"
+)
+
+# bm25 column weights, in table column order (unindexed columns included)
+RANK_WEIGHTS = (0.0, 0.0, 0.0, 10.0, 4.0, 1.0, 6.0)
+
+ENTITY_CODES = {'project': 0, 'blog': 1}
+
+_MARK_OPEN = '\x02'
+_MARK_CLOSE = '\x03'
+_TOKEN = re.compile(r'\w+', re.UNICODE)
+
+
+def _rowid(entity_type, entity_id):
+    return entity_id * len(ENTITY_CODES) + ENTITY_CODES[entity_type]
+
+
+def _plain(value):
+    from app.rendering import plain_text
+    return plain_text(value)
+
+
+def _document(target):
+    from app.models import Project, BlogPost
+
+    if isinstance(target, Project):
+        if not target.is_public:
+            return None
+        return {
+            'rowid': _rowid('project', target.id),
+            'entity_type': 'project',
+            'entity_id': target.id,
+            'user_id': target.user_id,
+            'title': target.title,
+            'summary': target.short_description or '',
+            'body': _plain(target.description),
+            'tags': target.tech_stack or '',
+        }
+    if isinstance(target, BlogPost):
+        if not target.is_published:
+            return None
+        return {
+            'rowid': _rowid('blog', target.id),
+            'entity_type': 'blog',
+            'entity_id': target.id,
+            'user_id': target.user_id,
+            'title': target.title,
+            'summary': target.excerpt or '',
+            'body': _plain(target.content),
+            'tags': '',
+        }
+    return None
+
+
+def _entity_type(target):
+    from app.models import Project
+    return 'project' if isinstance(target, Project) else 'blog'
+
+
+def is_available(connection):
+    return connection.dialect.name == 'sqlite'
+
+
+def index_document(connection, target):
+    if not is_available(connection):
+        return
+    connection.execute(text(f"DELETE FROM {SEARCH_TABLE} WHERE rowid = :rowid"),
+                       {'rowid': _rowid(_entity_type(target), target.id)})
+    document = _document(target)
+    if document is not None:
+        connection.execute(text(
+            f"INSERT INTO {SEARCH_TABLE} "
+            "(rowid, entity_type, entity_id, user_id, title, summary, body, tags) "
+            "VALUES (:rowid, :entity_type, :entity_id, :user_id, :title, :summary, :body, :tags)"
+        ), document)
+
+
+def remove_document(connection, target):
+    if not is_available(connection):
+        return
+    connection.execute(text(f"DELETE FROM {SEARCH_TABLE} WHERE rowid = :rowid"),
+                       {'rowid': _rowid(_entity_type(target), target.id)})
+
+
+def rebuild_index(connection, batch_size=500):
+    """Recreate the index from scratch; returns the number of indexed documents."""
+    from app.models import Project, BlogPost
+    from sqlalchemy.orm import Session
+
+    connection.execute(text(f"DROP TABLE IF EXISTS {SEARCH_TABLE}"))
+    connection.execute(text(CREATE_SEARCH_TABLE))
+
+    count = 0
+    session = Session(bind=connection)
+    for model, criterion in ((Project, Project.is_public == True),
+                             (BlogPost, BlogPost.is_published == True)):
+        query = session.query(model).filter(criterion).yield_per(batch_size)
+        for target in query:
+            index_document(connection, target)
+            count += 1
+    session.close()
+    return count
+
+
+def match_expression(query):
+    """Turn free text into a safe FTS5 query: every word must match, as a prefix."""
+    tokens = _TOKEN.findall(query or '')
+    return ' '.join(f'"{token}"*' for token in tokens[:12])
+
+
+def search(connection, query, limit=20, offset=0, entity_type=None):
+    expression = match_expression(query)
+    if not expression or not is_available(connection):
+        return []
+
+    weights = ', '.join(str(w) for w in RANK_WEIGHTS)
+    type_filter = 'AND s.entity_type = :entity_type' if entity_type else ''
+    rows = connection.execute(text(f"""
+        SELECT s.entity_type, s.entity_id, s.title,
+               snippet({SEARCH_TABLE}, -1, :open, :close, '…', 16) AS snippet,
+               bm25({SEARCH_TABLE}, {weights}) AS rank,
+               u.username, COALESCE(p.slug, b.slug) AS slug
+        FROM {SEARCH_TABLE} AS s
+        JOIN users AS u ON u.id = s.user_id
+        LEFT JOIN projects AS p ON s.entity_type = 'project' AND p.id = s.entity_id
+        LEFT JOIN blog_posts AS b ON s.entity_type = 'blog' AND b.id = s.entity_id
+        WHERE {SEARCH_TABLE} MATCH :expression {type_filter}
+        ORDER BY rank
+        LIMIT :limit OFFSET :offset
+    """), {
+        'expression': expression,
+        'open': _MARK_OPEN,
+        'close': _MARK_CLOSE,
+        'entity_type': entity_type,
+        'limit': limit,
+        'offset': offset,
+    }).mappings().all()
+
+    return [{
+        'type': row['entity_type'],
+        'id': row['entity_id'],
+        'title': row['title'],
+        'snippet': highlight(row['snippet']),
+        'username': row['username'],
+        'slug': row['slug'],
+        'rank': row['rank'],
+    } for row in rows]
+
+
+def highlight(snippet):
+    """Escape a snippet and turn the FTS markers into <mark> tags."""
+    escaped = str(escape(snippet or ''))
+    return Markup(escaped.replace(_MARK_OPEN, '<mark>').replace(_MARK_CLOSE, '</mark>'))
+
+
+_registered = False
+
+
+def register_search_hooks(db):
+    global _registered
+    if _registered:
+        return
+    _registered = True
+
+    from app.models import Project, BlogPost
+
+    event.listen(db.metadata, 'after_create',
+                 DDL(CREATE_SEARCH_TABLE).execute_if(dialect='sqlite'))
+
+    def reindex(mapper, connection, target):
+        index_document(connection, target)
+
+    def remove(mapper, connection, target):
+        remove_document(connection, target)
+
+    for model in (Project, BlogPost):
+        event.listen(model, 'after_insert', reindex)
+        event.listen(model, 'after_update', reindex)
+        event.listen(model, 'after_delete', remove)
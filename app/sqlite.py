@@ -0,0 +1,207 @@
+"""SQLite connection profiles.
+
+'default' leaves SQLite as it ships: a rollback journal and
+``synchronous=FULL``, so every commit (a view log, a counter bump) holds a
+database-wide lock that also stalls readers of public pages. 'production'
+switches the file to WAL, where readers keep reading the last committed
+snapshot while one writer appends, and sets the pragmas below on every new
+connection. Its pool is sized for threaded workers.
+
+Profiles only touch file-backed SQLite databases; in-memory databases and
+other backends are left as they are. ``flask benchmark-sqlite`` compares
+the two profiles under concurrent view writes.
+"""
+import os
+import statistics
+import tempfile
+import threading
+import time
+from datetime import datetime
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+
+PROFILES = {
+    'default': {},
+    'production': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',   # fsync at checkpoints only; a crash can lose the last commits, not the file
+        'mmap_size': 268435456,    # read up to 256 MiB of the file through mmap
+        'cache_size': -65536,      # 64 MiB page cache per connection
+        'busy_timeout': 5000,      # ms to wait for the write lock before "database is locked"
+        'temp_store': 'MEMORY',
+    },
+}
+
+
+def is_file_database(uri):
+    url = make_url(uri)
+    return url.get_backend_name() == 'sqlite' and url.database not in (None, '', ':memory:') \
+        and not url.database.startswith('file::memory:')
+
+
+def engine_options(profile, pool_size=10):
+    """Engine keyword arguments for a profile on a file-backed database."""
+    if profile == 'default':
+        return {}
+    # One connection per worker thread; a thread waits for a free one rather
+    # than opening more, since SQLite only ever runs one writer at a time
+    return {
+        'pool_size': pool_size,
+        'max_overflow': 0,
+        'pool_timeout': 30,
+        'connect_args': {'timeout': PROFILES[profile]['busy_timeout'] / 1000},
+    }
+
+
+def apply_pragmas(dbapi_connection, pragmas):
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name}={value}')
+    finally:
+        cursor.close()
+
+
+def listen_pragmas(engine, pragmas):
+    if not pragmas:
+        return
+
+    @event.listens_for(engine, 'connect')
+    def set_pragmas(dbapi_connection, connection_record):
+        apply_pragmas(dbapi_connection, pragmas)
+
+
+def configure_sqlite(app):
+    """Merge the profile's pool settings into SQLALCHEMY_ENGINE_OPTIONS.
+
+    Runs before ``db.init_app`` so the engine is created with them; options
+    already set in the config win.
+    """
+    app.config.setdefault('SQLITE_PROFILE', 'default')
+    app.config.setdefault('SQLITE_POOL_SIZE', 10)
+
+    profile = app.config['SQLITE_PROFILE']
+    if profile not in PROFILES:
+        raise ValueError(f"SQLITE_PROFILE must be one of {', '.join(PROFILES)}")
+    if not is_file_database(app.config['SQLALCHEMY_DATABASE_URI']):
+        return
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+        **engine_options(profile, app.config['SQLITE_POOL_SIZE']),
+        **app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {}),
+    }
+
+
+def register_sqlite_pragmas(app, db):
+    """Set the profile's pragmas on every connection of the app's SQLite engines."""
+    pragmas = PROFILES[app.config['SQLITE_PROFILE']]
+    with app.app_context():
+        for engine in db.engines.values():
+            if is_file_database(engine.url):
+                listen_pragmas(engine, pragmas)
+
+
+def benchmark(profile, readers=8, writers=2, duration=5.0, projects=200, pool_size=10):
+    """Public-page reads against concurrent unbuffered view-log writes on a scratch database.
+
+    Readers repeat the portfolio page's main queries; writers commit one
+    view at a time the way ``log_view`` does without the buffer. Returns
+    throughput and read latency figures.
+    """
+    from app.extensions import db
+    from app.models import User, Project, ViewLog, ViewDailyRollup, SiteCounter
+    from app.counters import view_log_deltas
+
+    folder = tempfile.mkdtemp(prefix='devfolio-bench-')
+    path = os.path.join(folder, 'bench.db')
+    engine = create_engine(f'sqlite:///{path}', **engine_options(profile, pool_size))
+    listen_pragmas(engine, PROFILES[profile])
+
+    users, projects_table = User.__table__, Project.__table__
+    try:
+        db.metadata.create_all(engine)
+        now = datetime.utcnow()
+        with engine.begin() as conn:
+            conn.execute(users.insert(), [
+                {'username': f'user{i}', 'email': f'user{i}@example.com', 'password_hash': '',
+                 'created_at': now, 'is_active': True, 'is_admin': False}
+                for i in range(20)
+            ])
+            user_ids = [row.id for row in conn.execute(db.select(users.c.id))]
+            conn.execute(projects_table.insert(), [
+                {'user_id': user_ids[i % len(user_ids)], 'title': f'Project {i}', 'slug': f'project-{i}',
+                 'description': 'Benchmark project', 'is_public': True, 'views': 0,
+                 'created_at': now, 'updated_at': now}
+                for i in range(projects)
+            ])
+
+        stop = threading.Event()
+        lock = threading.Lock()
+        latencies, errors = [], {'read': 0, 'write': 0}
+        writes = [0]
+
+        def read_loop(n):
+            i = n
+            while not stop.is_set():
+                username = f'user{i % 20}'
+                started = time.perf_counter()
+                try:
+                    with engine.connect() as conn:
+                        user = conn.execute(db.select(users).where(users.c.username == username)).first()
+                        conn.execute(
+                            db.select(projects_table)
+                            .where(projects_table.c.user_id == user.id, projects_table.c.is_public.is_(True))
+                            .order_by(projects_table.c.created_at.desc()).limit(6)
+                        ).all()
+                except Exception:
+                    with lock:
+                        errors['read'] += 1
+                    continue
+                with lock:
+                    latencies.append(time.perf_counter() - started)
+                i += 1
+
+        def write_loop(n):
+            i = n
+            while not stop.is_set():
+                row = {'entity_type': 'project', 'entity_id': i % projects + 1,
+                       'user_id': user_ids[i % len(user_ids)], 'ip_address': '127.0.0.1',
+                       'user_agent': 'benchmark', 'referrer': None, 'timestamp': datetime.utcnow()}
+                try:
+                    with engine.begin() as conn:
+                        conn.execute(ViewLog.__table__.insert().values(row))
+                        ViewDailyRollup.add_views(conn, [row])
+                        SiteCounter.add(conn, view_log_deltas([row]))
+                except Exception:
+                    with lock:
+                        errors['write'] += 1
+                    continue
+                with lock:
+                    writes[0] += 1
+                i += 1
+
+        threads = [threading.Thread(target=read_loop, args=(n,)) for n in range(readers)]
+        threads += [threading.Thread(target=write_loop, args=(n,)) for n in range(writers)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        time.sleep(duration)
+        stop.set()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+    finally:
+        engine.dispose()
+        for name in os.listdir(folder):
+            os.remove(os.path.join(folder, name))
+        os.rmdir(folder)
+
+    latencies.sort()
+    return {
+        'profile': profile,
+        'reads_per_sec': round(len(latencies) / elapsed, 1),
+        'writes_per_sec': round(writes[0] / elapsed, 1),
+        'read_p50_ms': round(statistics.median(latencies) * 1000, 2) if latencies else None,
+        'read_p95_ms': round(latencies[int(len(latencies) * 0.95)] * 1000, 2) if latencies else None,
+        'read_errors': errors['read'],
+        'write_errors': errors['write'],
+    }
@@ -0,0 +1,153 @@
+import hashlib
+import os
+import tempfile
+import uuid
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from app.extensions import db
+from app.images import is_image, manifest_path, derivative_paths
+
+CHUNK_SIZE = 64 * 1024
+
+
+def store_upload(file, subfolder, ext, pending=False):
+    """Write an uploaded file into ``subfolder`` and return its stored filename.
+
+    In 'content' mode (UPLOAD_STORAGE) the stream is hashed while it is
+    written and stored once as ``<sha256>.<ext>``; each call takes a
+    reference in the current session's transaction. In 'uuid' mode every
+    upload gets a fresh random name, as before.
+
+    A ``pending`` upload has no owner yet. It takes no reference and leaves
+    a zero-count row instead, which ``expire_pending_uploads`` reclaims
+    after UPLOAD_PENDING_TTL unless a reference to the same bytes is taken
+    by then.
+    """
+    from app.extensions import image_pipeline
+    from app.models import UploadRef
+
+    folder = os.path.join(current_app.config['UPLOAD_FOLDER'], subfolder)
+
+    if current_app.config.get('UPLOAD_STORAGE', 'content') != 'content':
+        filename = f"{uuid.uuid4().hex}.{ext}"
+        file.save(os.path.join(folder, filename))
+        if pending:
+            UploadRef.hold(db.session, subfolder, filename)
+        if is_image(filename):
+            image_pipeline.submit(subfolder, filename)
+        return filename
+
+    digest = hashlib.sha256()
+    size = 0
+    fd, tmp_path = tempfile.mkstemp(dir=folder, prefix='.upload-')
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            while True:
+                chunk = file.stream.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                out.write(chunk)
+                size += len(chunk)
+
+        filename = f"{digest.hexdigest()}.{ext}"
+        path = os.path.join(folder, filename)
+        # Reference first, bytes second. Taking the reference locks the row
+        # until this transaction ends, so a concurrent release of the same
+        # bytes has either finished deleting them (and they are put back
+        # below) or waits, sees this reference and keeps them. Identical
+        # bytes, so replacing an existing file is harmless.
+        if pending:
+            UploadRef.hold(db.session, subfolder, filename, size)
+        else:
+            UploadRef.acquire(db.session, subfolder, filename, size)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    if is_image(filename) and not os.path.exists(manifest_path(path)):
+        image_pipeline.submit(subfolder, filename)
+    return filename
+
+
+def release_upload(subfolder, filename):
+    """Drop one reference to a stored upload.
+
+    Bytes (and every image derivative) are removed after the surrounding
+    transaction commits, under the reference row's lock, and only if no
+    reference was taken again in the meantime. Files without a reference
+    row predate content addressing and are removed straight away.
+    """
+    from app.models import UploadRef
+
+    path = os.path.join(current_app.config['UPLOAD_FOLDER'], subfolder, filename)
+    remaining = UploadRef.release(db.session, subfolder, filename)
+
+    if remaining is None:
+        _remove_files(subfolder, filename, path)
+    elif remaining == 0:
+        db.session.info.setdefault('released_uploads', []).append(
+            (subfolder, filename, path, datetime.utcnow()))
+
+
+def _remove_files(subfolder, filename, path):
+    from app.extensions import image_resizer
+
+    config = current_app.config
+    for target in [path] + derivative_paths(path, config['IMAGE_DERIVATIVE_WIDTHS'],
+                                            config['IMAGE_DERIVATIVE_FORMATS']):
+        if os.path.exists(target):
+            os.remove(target)
+    image_resizer.discard(subfolder, filename)
+
+
+def expire_pending_uploads(ttl):
+    """Remove uploads left unreferenced for more than ``ttl`` seconds; returns how many."""
+    from app.models import UploadRef
+
+    cutoff = datetime.utcnow() - timedelta(seconds=ttl)
+    expired = UploadRef.unreferenced_before(db.session, cutoff)
+    # End the read so the deletes below aren't waiting on this session
+    db.session.commit()
+
+    engine = db.session.get_bind()
+    removed = 0
+    for subfolder, filename in expired:
+        path = os.path.join(current_app.config['UPLOAD_FOLDER'], subfolder, filename)
+        with engine.begin() as conn:
+            if UploadRef.remove_unreferenced(conn, subfolder, filename, before=cutoff):
+                try:
+                    _remove_files(subfolder, filename, path)
+                    removed += 1
+                except OSError as e:
+                    current_app.logger.error(f"Error deleting file: {e}")
+    return removed
+
+
+@event.listens_for(Session, 'after_commit')
+def _remove_released_uploads(session):
+    released = session.info.pop('released_uploads', None)
+    if not released:
+        return
+
+    from app.models import UploadRef
+    engine = session.get_bind()
+    for subfolder, filename, path, released_at in released:
+        # Files go while the row delete still holds its lock, so store_upload
+        # can't re-reference the bytes halfway through. A pending upload of
+        # the same bytes since the release restarted the row's clock and keeps them.
+        with engine.begin() as conn:
+            if UploadRef.remove_unreferenced(conn, subfolder, filename, before=released_at):
+                try:
+                    _remove_files(subfolder, filename, path)
+                except OSError as e:
+                    current_app.logger.error(f"Error deleting file: {e}")
+
+
+@event.listens_for(Session, 'after_rollback')
+def _keep_released_uploads(session):
+    session.info.pop('released_uploads', None)
@@ -0,0 +1,207 @@
+"""Normalized technology tags for projects.
+
+``Project.tech_stack`` stays the free-text field users edit; the rows in
+``technologies``/``project_technologies`` are derived from it by
+``Project.sync_technologies()``. Names are compared case-folded, so
+"Flask", "flask" and " FLASK " are one technology, shown with the spelling
+it was first created with, in the order they appear in the stack
+(``project_technologies.position``). ``Technology.project_count`` (public
+projects only) is refreshed by the session hooks below for exactly the
+technologies a flush touched.
+"""
+from datetime import datetime
+from sqlalchemy import event, inspect
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+MAX_NAME_LENGTH = 64
+
+
+def canonical_name(name):
+    return ' '.join((name or '').split()).casefold()[:MAX_NAME_LENGTH]
+
+
+def parse_tech_stack(tech_stack):
+    """Split a comma-separated stack into display names, dropping blanks and duplicates."""
+    names = []
+    seen = set()
+    for part in (tech_stack or '').split(','):
+        name = ' '.join(part.split())[:MAX_NAME_LENGTH]
+        key = name.casefold()
+        if name and key not in seen:
+            seen.add(key)
+            names.append(name)
+    return names
+
+
+def technologies_for(tech_stack):
+    """Technology rows for ``tech_stack``, in stack order, inserting missing ones."""
+    from app.extensions import db
+    from app.models import Technology
+
+    names = {canonical_name(name): name for name in parse_tech_stack(tech_stack)}
+    if not names:
+        return []
+
+    with db.session.no_autoflush:
+        existing = {tech.name: tech for tech in
+                    Technology.query.filter(Technology.name.in_(list(names))).all()}
+        missing = {key: name for key, name in names.items() if key not in existing}
+        if missing:
+            _insert_missing(db.session, missing)
+            existing.update((tech.name, tech) for tech in
+                            Technology.query.filter(Technology.name.in_(list(missing))).all())
+    return [existing[key] for key in names]
+
+
+def _insert_missing(session, names):
+    """Insert technologies by name, skipping any another transaction created first."""
+    from app.models import Technology
+
+    table = Technology.__table__
+    now = datetime.utcnow()
+    rows = [{'name': key, 'display_name': name, 'project_count': 0, 'created_at': now}
+            for key, name in names.items()]
+    dialect = session.get_bind().dialect.name
+
+    if dialect in ('sqlite', 'postgresql'):
+        if dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert
+        session.execute(insert(table).values(rows).on_conflict_do_nothing(index_elements=[table.c.name]))
+        return
+
+    for row in rows:
+        try:
+            with session.begin_nested():
+                session.execute(table.insert().values(row))
+        except IntegrityError:
+            pass
+
+
+def keep_order(project):
+    """Have the next flush store ``project.technologies``' order as link positions."""
+    from app.extensions import db
+    db.session.info.setdefault('technology_order', set()).add(project)
+
+
+def technology_names(project_ids):
+    """Display names of each project's technologies in stack order, keyed by project id."""
+    from app.extensions import db
+    from app.models import Technology, project_technologies
+
+    names = {}
+    if not project_ids:
+        return names
+    rows = db.session.execute(
+        db.select(project_technologies.c.project_id, Technology.display_name)
+        .join(Technology, Technology.id == project_technologies.c.technology_id)
+        .where(project_technologies.c.project_id.in_(list(project_ids)))
+        .order_by(project_technologies.c.project_id, project_technologies.c.position)
+    ).all()
+    for project_id, display_name in rows:
+        names.setdefault(project_id, []).append(display_name)
+    return names
+
+
+def store_positions(connection, projects):
+    """Number each project's links in the order of its ``technologies`` list."""
+    from app.extensions import db
+    from app.models import project_technologies as links
+
+    rows = [{'_project_id': project.id, '_technology_id': tech.id, '_position': position}
+            for project in projects for position, tech in enumerate(project.technologies)]
+    if rows:
+        connection.execute(
+            links.update().where(links.c.project_id == db.bindparam('_project_id'),
+                                 links.c.technology_id == db.bindparam('_technology_id'))
+            .values(position=db.bindparam('_position')),
+            rows
+        )
+
+
+def refresh_counts(connection, technology_ids=None):
+    """Recompute ``project_count`` for the given technologies, or for all of them."""
+    from app.extensions import db
+    from app.models import Technology, Project, project_technologies
+
+    table = Technology.__table__
+    links = project_technologies
+    count = db.select(db.func.count()).select_from(
+        links.join(Project.__table__, Project.__table__.c.id == links.c.project_id)
+    ).where(
+        links.c.technology_id == table.c.id,
+        Project.__table__.c.is_public == True
+    ).scalar_subquery()
+
+    stmt = table.update().values(project_count=count)
+    if technology_ids is not None:
+        if not technology_ids:
+            return
+        stmt = stmt.where(table.c.id.in_(list(technology_ids)))
+    connection.execute(stmt)
+
+
+def _touched_technologies(session):
+    from app.models import Project
+
+    touched = set()
+    for project in session.new:
+        if isinstance(project, Project):
+            touched.update(project.technologies)
+    for project in session.dirty:
+        if not isinstance(project, Project):
+            continue
+        state = inspect(project)
+        if state.attrs.is_public.history.has_changes() or \
+                state.attrs.technologies.history.has_changes():
+            history = state.attrs.technologies.load_history()
+            touched.update(history.added or ())
+            touched.update(history.unchanged or ())
+            touched.update(history.deleted or ())
+    for project in session.deleted:
+        if isinstance(project, Project):
+            touched.update(project.technologies)
+    return touched
+
+
+_registered = False
+
+
+def register_technology_hooks(db):
+    global _registered
+    if _registered:
+        return
+    _registered = True
+
+    @event.listens_for(Session, 'before_flush')
+    def collect_touched(session, flush_context, instances):
+        touched = _touched_technologies(session)
+        if touched:
+            session.info.setdefault('technology_counts', set()).update(touched)
+
+    @event.listens_for(Session, 'after_flush')
+    def update_counts(session, flush_context):
+        touched = session.info.pop('technology_counts', None)
+        if touched:
+            ids = {tech.id for tech in touched if tech.id is not None}
+            refresh_counts(session.connection(), ids)
+
+    @event.listens_for(Session, 'after_flush_postexec')
+    def update_positions(session, flush_context):
+        # Projects not added to the session yet wait for a later flush
+        pending = session.info.get('technology_order')
+        flushed = {project for project in pending or () if inspect(project).persistent}
+        if flushed:
+            pending.difference_update(flushed)
+            store_positions(session.connection(), flushed)
+
+    @event.listens_for(Session, 'after_commit')
+    def discard_unflushed(session):
+        session.info.pop('technology_order', None)
+
+    @event.listens_for(Session, 'after_rollback')
+    def discard_touched(session):
+        session.info.pop('technology_counts', None)
+        session.info.pop('technology_order', None)
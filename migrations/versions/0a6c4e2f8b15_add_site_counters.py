@@ -0,0 +1,30 @@
+"""Add site_counters for the admin dashboard
+
+Revision ID: 0a6c4e2f8b15
+Revises: f3b7d1e9a264
+Create Date: 2026-10-18 17:48:39.205716
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0a6c4e2f8b15'
+down_revision = 'f3b7d1e9a264'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('site_counters',
+    sa.Column('name', sa.String(length=32), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('name', 'day')
+    )
+    # Existing rows are counted with `flask reconcile-site-counters`
+
+
+def downgrade():
+    op.drop_table('site_counters')
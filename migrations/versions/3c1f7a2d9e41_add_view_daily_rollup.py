@@ -0,0 +1,39 @@
+"""Add view_daily_rollup
+
+Revision ID: 3c1f7a2d9e41
+Revises: 89f03061cd50
+Create Date: 2026-10-18 09:12:04.118203
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3c1f7a2d9e41'
+down_revision = '89f03061cd50'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('view_daily_rollup',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('entity_type', sa.String(length=20), nullable=False),
+    sa.Column('entity_id', sa.Integer(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('user_id', 'entity_type', 'entity_id', 'day')
+    )
+    with op.batch_alter_table('view_daily_rollup', schema=None) as batch_op:
+        batch_op.create_index('ix_view_daily_rollup_user_day', ['user_id', 'day'], unique=False)
+
+    # Existing view history is folded in with `flask backfill-view-rollups`
+
+
+def downgrade():
+    with op.batch_alter_table('view_daily_rollup', schema=None) as batch_op:
+        batch_op.drop_index('ix_view_daily_rollup_user_day')
+
+    op.drop_table('view_daily_rollup')
@@ -0,0 +1,77 @@
+"""Add render-at-write columns to projects and blog_posts
+
+Revision ID: 5d2e8a1c7f30
+Revises: 0a6c4e2f8b15
+Create Date: 2026-10-18 18:35:02.117384
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5d2e8a1c7f30'
+down_revision = '0a6c4e2f8b15'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('projects', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('description_html', sa.Text(), nullable=True))
+        batch_op.add_column(sa.Column('summary', sa.String(length=300), nullable=True))
+        batch_op.add_column(sa.Column('word_count', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('reading_time', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('render_version', sa.Integer(), nullable=True))
+
+    with op.batch_alter_table('blog_posts', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('content_html', sa.Text(), nullable=True))
+        batch_op.add_column(sa.Column('summary', sa.String(length=300), nullable=True))
+        batch_op.add_column(sa.Column('word_count', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('reading_time', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('render_version', sa.Integer(), nullable=True))
+
+    # Render existing rows now so pages never show an empty summary;
+    # `flask rerender-content` redoes this after a renderer change
+    from app.rendering import project_fields, post_fields
+    _render_existing('projects', 'description', 'short_description', project_fields)
+    _render_existing('blog_posts', 'content', 'excerpt', post_fields)
+
+
+def _render_existing(name, source, short, render, batch_size=500):
+    bind = op.get_bind()
+    table = sa.table(name, sa.column('id', sa.Integer()), sa.column(source, sa.Text()),
+                     sa.column(short, sa.Text()))
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(table.c.id, table.c[source], table.c[short])
+            .where(table.c.id > last_id).order_by(table.c.id).limit(batch_size)
+        ).all()
+        if not rows:
+            break
+        values = [dict(render(row[1], row[2]), _id=row[0]) for row in rows]
+        names = [key for key in values[0] if key != '_id']
+        columns = sa.table(name, sa.column('id', sa.Integer()), *(sa.column(key) for key in names))
+        bind.execute(
+            columns.update().where(columns.c.id == sa.bindparam('_id'))
+            .values({key: sa.bindparam(key) for key in names}),
+            values
+        )
+        last_id = rows[-1][0]
+
+
+def downgrade():
+    with op.batch_alter_table('blog_posts', schema=None) as batch_op:
+        batch_op.drop_column('render_version')
+        batch_op.drop_column('reading_time')
+        batch_op.drop_column('word_count')
+        batch_op.drop_column('summary')
+        batch_op.drop_column('content_html')
+
+    with op.batch_alter_table('projects', schema=None) as batch_op:
+        batch_op.drop_column('render_version')
+        batch_op.drop_column('reading_time')
+        batch_op.drop_column('word_count')
+        batch_op.drop_column('summary')
+        batch_op.drop_column('description_html')
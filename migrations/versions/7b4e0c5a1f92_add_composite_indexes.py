@@ -0,0 +1,66 @@
+"""Add composite indexes for hot filters
+
+Revision ID: 7b4e0c5a1f92
+Revises: 3c1f7a2d9e41
+Create Date: 2026-10-18 11:40:52.602917
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7b4e0c5a1f92'
+down_revision = '3c1f7a2d9e41'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.create_index('ix_users_created_at', ['created_at'], unique=False)
+
+    with op.batch_alter_table('skills', schema=None) as batch_op:
+        batch_op.create_index('ix_skills_user_created', ['user_id', 'created_at'], unique=False)
+
+    with op.batch_alter_table('projects', schema=None) as batch_op:
+        batch_op.create_index('ix_projects_user_created', ['user_id', 'created_at'], unique=False)
+        batch_op.create_index('ix_projects_public_created', ['is_public', 'created_at'], unique=False)
+        batch_op.create_index('ix_projects_featured_public_created', ['is_featured', 'is_public', 'created_at'], unique=False)
+        batch_op.create_index('ix_projects_created_at', ['created_at'], unique=False)
+        batch_op.create_index('ix_projects_views', ['views'], unique=False)
+
+    with op.batch_alter_table('achievements', schema=None) as batch_op:
+        batch_op.create_index('ix_achievements_user_created', ['user_id', 'created_at'], unique=False)
+
+    with op.batch_alter_table('blog_posts', schema=None) as batch_op:
+        batch_op.create_index('ix_blog_posts_user_created', ['user_id', 'created_at'], unique=False)
+        batch_op.create_index('ix_blog_posts_published_created', ['is_published', 'created_at'], unique=False)
+
+    with op.batch_alter_table('view_logs', schema=None) as batch_op:
+        batch_op.create_index('ix_view_logs_user_timestamp', ['user_id', 'timestamp'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('view_logs', schema=None) as batch_op:
+        batch_op.drop_index('ix_view_logs_user_timestamp')
+
+    with op.batch_alter_table('blog_posts', schema=None) as batch_op:
+        batch_op.drop_index('ix_blog_posts_published_created')
+        batch_op.drop_index('ix_blog_posts_user_created')
+
+    with op.batch_alter_table('achievements', schema=None) as batch_op:
+        batch_op.drop_index('ix_achievements_user_created')
+
+    with op.batch_alter_table('projects', schema=None) as batch_op:
+        batch_op.drop_index('ix_projects_views')
+        batch_op.drop_index('ix_projects_created_at')
+        batch_op.drop_index('ix_projects_featured_public_created')
+        batch_op.drop_index('ix_projects_public_created')
+        batch_op.drop_index('ix_projects_user_created')
+
+    with op.batch_alter_table('skills', schema=None) as batch_op:
+        batch_op.drop_index('ix_skills_user_created')
+
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_index('ix_users_created_at')
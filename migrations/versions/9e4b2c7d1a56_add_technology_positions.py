@@ -0,0 +1,63 @@
+"""Keep the stack order of project technologies
+
+Revision ID: 9e4b2c7d1a56
+Revises: 5d2e8a1c7f30
+Create Date: 2026-10-18 20:12:47.530918
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9e4b2c7d1a56'
+down_revision = '5d2e8a1c7f30'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('project_technologies', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('position', sa.Integer(), server_default='0', nullable=False))
+
+    # Number existing links in the order their project's tech_stack names them
+    from app.technologies import canonical_name, parse_tech_stack
+
+    bind = op.get_bind()
+    projects = sa.table('projects', sa.column('id', sa.Integer()), sa.column('tech_stack', sa.Text()))
+    technologies = sa.table('technologies', sa.column('id', sa.Integer()), sa.column('name', sa.String()))
+    links = sa.table('project_technologies', sa.column('project_id', sa.Integer()),
+                     sa.column('technology_id', sa.Integer()), sa.column('position', sa.Integer()))
+
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(projects.c.id, projects.c.tech_stack)
+            .where(projects.c.id > last_id).order_by(projects.c.id).limit(500)
+        ).all()
+        if not rows:
+            break
+        linked = bind.execute(
+            sa.select(links.c.project_id, links.c.technology_id, technologies.c.name)
+            .join(technologies, technologies.c.id == links.c.technology_id)
+            .where(links.c.project_id.in_([row[0] for row in rows]))
+        ).all()
+        order = {row[0]: {canonical_name(name): position
+                          for position, name in enumerate(parse_tech_stack(row[1]))}
+                 for row in rows}
+        values = [{'_project_id': project_id, '_technology_id': technology_id,
+                   '_position': order[project_id].get(name, 0)}
+                  for project_id, technology_id, name in linked]
+        if values:
+            bind.execute(
+                links.update().where(links.c.project_id == sa.bindparam('_project_id'),
+                                     links.c.technology_id == sa.bindparam('_technology_id'))
+                .values(position=sa.bindparam('_position')),
+                values
+            )
+        last_id = rows[-1][0]
+
+
+def downgrade():
+    with op.batch_alter_table('project_technologies', schema=None) as batch_op:
+        batch_op.drop_column('position')
@@ -0,0 +1,31 @@
+"""Add upload_refs for content-addressed uploads
+
+Revision ID: c2d8e6f4a017
+Revises: 7b4e0c5a1f92
+Create Date: 2026-10-18 14:03:27.514390
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c2d8e6f4a017'
+down_revision = '7b4e0c5a1f92'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('upload_refs',
+    sa.Column('subfolder', sa.String(length=50), nullable=False),
+    sa.Column('filename', sa.String(length=255), nullable=False),
+    sa.Column('ref_count', sa.Integer(), nullable=False),
+    sa.Column('size', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('subfolder', 'filename')
+    )
+
+
+def downgrade():
+    op.drop_table('upload_refs')
@@ -0,0 +1,34 @@
+"""Add FTS5 search_index for projects and blog posts
+
+Revision ID: e5a9b3c71d28
+Revises: c2d8e6f4a017
+Create Date: 2026-10-18 16:21:45.903114
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5a9b3c71d28'
+down_revision = 'c2d8e6f4a017'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # FTS5 is SQLite-only; other backends run without full-text search
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    op.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5("
+        "entity_type UNINDEXED, entity_id UNINDEXED, user_id UNINDEXED, "
+        "title, summary, body, tags, tokenize='porter unicode61')"
+    )
+    # Existing rows are indexed with `flask rebuild-search-index`
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    op.execute("DROP TABLE IF EXISTS search_index")
@@ -0,0 +1,54 @@
+"""Add technologies and project_technologies
+
+Revision ID: f3b7d1e9a264
+Revises: e5a9b3c71d28
+Create Date: 2026-10-18 17:02:11.648203
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3b7d1e9a264'
+down_revision = 'e5a9b3c71d28'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('technologies',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=64), nullable=False),
+    sa.Column('display_name', sa.String(length=64), nullable=False),
+    sa.Column('project_count', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('technologies', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_technologies_name'), ['name'], unique=True)
+        batch_op.create_index('ix_technologies_project_count', ['project_count'], unique=False)
+
+    op.create_table('project_technologies',
+    sa.Column('project_id', sa.Integer(), nullable=False),
+    sa.Column('technology_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['project_id'], ['projects.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['technology_id'], ['technologies.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('project_id', 'technology_id')
+    )
+    with op.batch_alter_table('project_technologies', schema=None) as batch_op:
+        batch_op.create_index('ix_project_technologies_technology', ['technology_id', 'project_id'], unique=False)
+
+    # Existing projects are linked with `flask sync-technologies`
+
+
+def downgrade():
+    with op.batch_alter_table('project_technologies', schema=None) as batch_op:
+        batch_op.drop_index('ix_project_technologies_technology')
+
+    op.drop_table('project_technologies')
+    with op.batch_alter_table('technologies', schema=None) as batch_op:
+        batch_op.drop_index('ix_technologies_project_count')
+        batch_op.drop_index(batch_op.f('ix_technologies_name'))
+
+    op.drop_table('technologies')
@@ -2,7 +2,10 @@ import os
 from app import create_app
 from app.extensions import db
 
-app = create_app(os.getenv('FLASK_ENV') or 'default')
+# Image worker processes are spawned and re-import this file as __mp_main__;
+# they only run make_derivatives and mustn't build an app (and its flushers)
+if __name__ != '__mp_main__':
+    app = create_app(os.getenv('FLASK_ENV') or 'default')
 
 if __name__ == '__main__':
     with app.app_context():
@@ -0,0 +1,11 @@
+from app import create_app
+from app.query_plans import check_query_plans
+
+
+def test_routes_use_indexes():
+    findings, failures = check_query_plans(create_app('testing'))
+
+    assert not failures, [f'{endpoint}: {method} {url}: {error}'
+                          for endpoint, method, url, error in failures]
+    assert not findings, [f'{endpoint}: full scan of {table}: {" ".join(statement.split())}'
+                          for endpoint, table, statement, plan in findings]